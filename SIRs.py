@@ -1,6 +1,7 @@
 # Author: E. Tirado-Bueno (etirado@inaoe.mx)
 # Last Update: 17 / 02 / 2025
 # --------------------------------------------------------------------------------------------------------------------------------------
+import importlib.util
 import subprocess
 import sys
 # --------------------------------------------------------------------------------------------------------------------------------------
@@ -13,9 +14,11 @@ def install_package(package):
 # --------------------------------------------------------------------------------------------------------------------------------------
 # --------------------------------------------------------------------------------------------------------------------------------------
 
-install_package("sunpy")
-install_package("astropy")
-install_package("matplotlib")
+# Install only the packages that are missing (no pip call at all when everything is already available):
+
+for package in ["sunpy", "astropy", "matplotlib"]:
+    if importlib.util.find_spec(package) is None:
+        install_package(package)
 
 # --------------------------------------------------------------------------------------------------------------------------------------
 
@@ -29,9 +32,11 @@ from matplotlib.animation import FuncAnimation
 import astropy.units as u
 from astropy.coordinates import Longitude
 
-from sunpy.coordinates import HeliocentricEarthEcliptic, get_body_heliographic_stonyhurst, get_horizons_coord
+from sunpy.coordinates import HeliocentricEarthEcliptic
 from sunpy.time import parse_time
 
+from ephemeris_cache import EphemerisCache
+
 # --------------------------------------------------------------------------------------------------------------------------------------
 
 year = input("Enter the year: ")
@@ -55,13 +60,16 @@ def get_first_orbit(coord):
         return coord[:ends[0]]
     return coord
 
+# Ephemerides are served from the local cache (set offline=True on nodes without network access):
+ephemeris = EphemerisCache('ephemeris_cache', offline=False)
+
 planets = ['Earth']
 times = obstime + np.arange(700) * u.day
-planet_coords = {planet: get_first_orbit(get_body_heliographic_stonyhurst(planet, times))
+planet_coords = {planet: get_first_orbit(ephemeris.get(planet, times))
                  for planet in planets}
 
-stereo_a = get_horizons_coord('STEREO-A', obstime)
-stereo_b = get_horizons_coord('STEREO-B', obstime)
+stereo_a = ephemeris.get('STEREO-A', obstime)
+stereo_b = ephemeris.get('STEREO-B', obstime)
 
 print('---------------------------------------------------------------------')
 
@@ -0,0 +1,297 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Offline benchmark suite: frame generation, log output and log parsing for growing n_points and frame counts, plus the HEE
+# background of a few synthetic epochs with stubbed (LocalEphemeris) ephemerides. No network access is needed.
+#
+#   python benchmarks/run_benchmarks.py                  # run and compare with benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --save           # run and store the results as the new baseline
+#   python benchmarks/run_benchmarks.py --quick          # smallest sizes only
+#
+# Every case is timed repeat times and the best time is kept. Metrics:
+#   frames_per_s, points_per_s   frame generation (points_per_s counts both streams)
+#   bytes_per_frame              output size per frame
+#   lines_per_s                  log parsing
+#   epochs_per_s                 HEE background (ephemeris lookup and transform)
+# A metric more than --tolerance worse than the baseline is reported as a regression (exit status 1).
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spiral_engine import FrameKernel, iter_frame_chunks, rotate_frames, spiral_t0
+from spiral_io import export_text_log, write_spiral_binary
+from spiral_log import parse_spiral_log, simulated_distances
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+point_counts = [50, 500, 5000]
+frame_counts = [360, 3600]
+max_text_samples = 2_000_000                                                     # Largest frames x points written as text
+
+rows = [15, 20, 25, 30, 35, 40, 45]
+obstime = np.datetime64('2008-01-23T16:39', 'ms')
+epochs = ['2008-01-23T16:39:00', '2008-06-01T00:00:00', '2009-03-15T12:00:00']
+
+higher_is_better = {'frames_per_s', 'points_per_s', 'lines_per_s', 'epochs_per_s'}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Reference implementations of the original per-frame code (SIRs_v1.py update() and reading_spiral_data_v3.py), for comparison:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def legacy_frames(x_slow, y_slow, x_fast, y_fast, theta_values):
+    for theta in theta_values:
+        x_rot_slow = -(x_slow * np.cos(theta) - y_slow * np.sin(theta))
+        y_rot_slow = -(x_slow * np.sin(theta) + y_slow * np.cos(theta))
+        x_rot_fast = -(x_fast * np.cos(theta) - y_fast * np.sin(theta))
+        y_rot_fast = -(x_fast * np.sin(theta) + y_fast * np.cos(theta))
+        np.sqrt((x_rot_slow - 1) ** 2 + y_rot_slow ** 2)
+        np.sqrt((x_rot_fast - 1) ** 2 + y_rot_fast ** 2)
+        np.column_stack((y_rot_slow, x_rot_slow))
+        np.column_stack((y_rot_fast, x_rot_fast))
+
+def legacy_append(path, times, x_rot, y_rot, distances):
+    for frame, current_time in enumerate(times):
+        current_date_str = current_time.astype('datetime64[m]').item().strftime('%d-%b-%Y %H:%M UT')
+        with open(path, 'a') as file:
+            file.write(f"Frame {frame} - Date: {current_date_str}:\n")
+            for x_f, y_f, d_f in zip(y_rot[frame], x_rot[frame], distances[frame]):
+                file.write(f"Slow Spiral - x: {x_f:.3f}, y: {y_f:.3f}, Distance to Earth [AU]: {d_f:.3f}\n")
+            file.write("\n")
+
+def legacy_parse(path, target_rows):
+    import pandas as pd
+
+    with open(path, 'r') as file:
+        lines = file.readlines()
+
+    distance_regex = re.compile(r"Distance to Earth \[AU\]:\s*([0-9\.]+)")
+    results, frame_lines, date, in_frame = [], [], None, False
+
+    def close_frame():
+        values = [date]
+        for row in target_rows:
+            match = distance_regex.search(frame_lines[row]) if row < len(frame_lines) else None
+            values.append(match.group(1) if match else None)
+        results.append(values)
+
+    for line in lines:
+        if line.startswith("Frame"):
+            if frame_lines:
+                close_frame()
+            date = line.split("Date")[1].split("UT:")[0].strip()
+            frame_lines, in_frame = [], True
+            continue
+        if in_frame:
+            frame_lines.append(line.strip())
+    if frame_lines:
+        close_frame()
+
+    df = pd.DataFrame(results, columns=["Date"] + [f"Distance_Row_{r}" for r in target_rows])
+    month_map = {'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
+                 'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'}
+    df["Date"] = df["Date"].apply(lambda text: text.replace(text.split('-')[1], month_map[text.split('-')[1]]))
+    df[['Day', 'Month', 'Year_Time']] = df['Date'].str.split('-', expand=True)
+    df[['Year', 'Time']] = df['Year_Time'].str.split(' ', expand=True)
+    df[['Hour', 'Minute']] = df['Time'].str.split(':', expand=True)
+    df = df.drop(columns=['Year_Time', 'Time', 'Date'])
+    df["Day"] = df["Day"].str.replace(":", "", regex=True)
+    df["Datetime"] = pd.to_datetime(df[["Year", "Month", "Day", "Hour", "Minute"]])
+    return df.set_index("Datetime")
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Timing:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def best_time(function, repeat, setup=None):
+    best = np.inf
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Cases. Each returns {case name: {metric: value}}:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def bench_frames(n_points, n_frames, repeat):
+    slow = spiral_t0(294, 0.3, 2.5, n_points, -46)
+    fast = spiral_t0(694, 0.3, 2.5, n_points, -46)
+    stacked = np.stack((slow[0], fast[0])), np.stack((slow[1], fast[1]))                # (streams, points)
+    theta_values = np.arange(n_frames) * (np.pi / 180)
+
+    def kernels():
+        for kernel in (FrameKernel(*slow, theta_values), FrameKernel(*fast, theta_values)):
+            for frame in range(n_frames):
+                kernel.compute(frame)
+
+    def stacked_kernel():
+        kernel = FrameKernel(*stacked, theta_values)
+        for frame in range(n_frames):
+            kernel.compute(frame)
+
+    def chunks():
+        for chunk in iter_frame_chunks({'slow': slow, 'fast': fast}, n_frames, chunk_frames=1024):
+            pass
+
+    cases = {'legacy_update': lambda: legacy_frames(*slow, *fast, theta_values),
+             'rotate_frames': lambda: (rotate_frames(*slow, theta_values), rotate_frames(*fast, theta_values)),
+             'rotate_frames_stacked': lambda: rotate_frames(*stacked, theta_values),
+             'frame_kernel': kernels,
+             'frame_kernel_stacked': stacked_kernel,
+             'frame_chunks': chunks}
+
+    results = {}
+    for name, function in cases.items():
+        seconds = best_time(function, repeat)
+        results[f"frames/{name}/p{n_points}/f{n_frames}"] = {'frames_per_s': n_frames / seconds,
+                                                              'points_per_s': 2 * n_frames * n_points / seconds}
+    return results
+
+def bench_output_and_parse(n_points, n_frames, repeat, directory):
+    x_rot, y_rot, distances = rotate_frames(*spiral_t0(694, 0.3, 2.5, n_points, -46), np.arange(n_frames) * (np.pi / 180))
+    hours = np.arange(n_frames) * 1.927
+    times = obstime + np.round(hours * 3.6e6).astype('timedelta64[ms]')
+    size = f"p{n_points}/f{n_frames}"
+
+    legacy_path = os.path.join(directory, 'legacy.txt')
+    text_path = os.path.join(directory, 'spiral_data.txt')
+    binary_path = os.path.join(directory, 'spiral_data.sirs')
+
+    results = {}
+    outputs = {'legacy_append': (legacy_path, lambda: legacy_append(legacy_path, times, x_rot, y_rot, distances)),
+               'text_log': (text_path, lambda: export_text_log(text_path, times, x_rot, y_rot, distances)),
+               'binary': (binary_path, lambda: write_spiral_binary(binary_path, obstime, hours, {'fast': (x_rot, y_rot, distances)}))}
+    for name, (path, function) in outputs.items():
+        seconds = best_time(function, repeat, setup=lambda: _remove(path))
+        results[f"output/{name}/{size}"] = {'frames_per_s': n_frames / seconds, 'bytes_per_frame': os.path.getsize(path) / n_frames}
+
+    n_lines = n_frames * (n_points + 2)
+    parsers = {'legacy_parse': lambda: legacy_parse(text_path, rows),
+               'spiral_log': lambda: simulated_distances(parse_spiral_log(text_path, ('distance',)), rows)}
+    for name, function in parsers.items():
+        seconds = best_time(function, repeat)
+        results[f"parse/{name}/{size}"] = {'lines_per_s': n_lines / seconds}
+    return results
+
+def bench_background(repeat, directory):
+    from ephemeris_cache import EphemerisCache, LocalEphemeris, SunpyFetcher
+    from hee_coords import _background_cache, hee_background
+    from sunpy.time import parse_time
+
+    # Stub ephemerides: Earth from the local planetary ephemeris, STEREO-A/B on circular orbits drifting away from it:
+    tables = LocalEphemeris(os.path.join(directory, 'tables'))
+    jd = parse_time(epochs[0]).utc.jd - 5 + np.arange(1300.0)
+    earth = SunpyFetcher().fetch('earth', jd)
+    tables.save('Earth', jd, earth)
+    for body, sign in (('STEREO-A', 1), ('STEREO-B', -1)):
+        angle = np.arctan2(earth[1], earth[0]) + sign * np.radians(0.06 * (jd - jd[0]))
+        tables.save(body, jd, np.array([np.cos(angle), np.sin(angle), np.zeros_like(angle)]))
+
+    ephemeris = EphemerisCache(os.path.join(directory, 'cache'), tables)
+    times = [parse_time(epoch) for epoch in epochs]
+    for obstime in times:                                                        # Fill the on-disk cache once
+        hee_background(obstime, ephemeris)
+
+    seconds = best_time(lambda: [hee_background(obstime, ephemeris) for obstime in times], repeat, setup=_background_cache.clear)
+    return {'background/hee_background': {'epochs_per_s': len(epochs) / seconds}}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def run_all(quick=False, repeat=3):
+    points = point_counts[:1] if quick else point_counts
+    frames = frame_counts[:1] if quick else frame_counts
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for n_points in points:
+            for n_frames in frames:
+                results.update(bench_frames(n_points, n_frames, repeat))
+                if n_points * n_frames <= max_text_samples:
+                    results.update(bench_output_and_parse(n_points, n_frames, repeat, directory))
+
+        if importlib.util.find_spec('sunpy') is not None:
+            results.update(bench_background(repeat, directory))
+
+    return results
+
+# Regressions: metrics more than tolerance worse than the baseline, as (case, metric, baseline, value):
+def compare(results, baseline, tolerance=0.25):
+    regressions = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(case, {}).get(metric)
+            if reference is None:
+                continue
+            if metric in higher_is_better:
+                worse = value < reference * (1 - tolerance)
+            else:
+                worse = value > reference * (1 + tolerance)
+            if worse:
+                regressions.append((case, metric, reference, value))
+    return regressions
+
+def report(results, baseline):
+    for case, metrics in sorted(results.items()):
+        cells = []
+        for metric, value in metrics.items():
+            reference = baseline.get(case, {}).get(metric)
+            change = f" ({value / reference - 1:+.0%})" if reference else ''
+            cells.append(f"{metric} {value:,.0f}{change}")
+        print(f"{case:<42} {'   '.join(cells)}")
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline benchmarks of the SIR spiral pipeline.')
+    parser.add_argument('--quick', action='store_true', help='smallest sizes only')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=baseline_path)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='relative slowdown reported as a regression')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run_all(args.quick, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+
+    report(results, baseline)
+
+    document = {'machine': platform.platform(), 'python': platform.python_version(), 'numpy': np.__version__, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(document, file, indent=2, sort_keys=True)
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump(document, file, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for case, metric, reference, value in regressions:
+        print(f"REGRESSION {case} {metric}: {value:,.1f} vs baseline {reference:,.1f}")
+    sys.exit(1 if regressions else 0)
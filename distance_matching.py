@@ -0,0 +1,278 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Match simulated distances (simulated_distances layout of reading_spiral_data_v3.py, or a parameter sweep) against an observed
+# in-situ time series (e.g. an OMNI-style CSV of solar wind speed), by FFT cross-correlation.
+#
+# Both series are resampled onto the same regular grid; gaps (NaN, fill values, holes longer than max_gap_hours) are masked. The
+# Pearson correlation at every lag is computed from six FFT cross-correlations of the masked series and their masks, so gaps and
+# partial overlaps are handled exactly, and all the simulated rows of a block are transformed at once against a single FFT of the
+# observed series.
+#
+# A lag tau means that the simulated series, delayed by tau, best matches the observations: r(tau) = corr(observed(t), sim(t - tau)).
+# sign=-1 (the default) correlates the observations with minus the distance, so spiral passages (distance minima) line up with
+# observed peaks.
+#
+#   python distance_matching.py omni.csv --column V --simulated simulated_distances.txt --output matches.csv
+#   python distance_matching.py omni.csv --column V --sweep sweep.npz --obstime 2008-01-23T16:39 --output sweep_scores.csv
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import argparse
+
+import numpy as np
+
+from spiral_engine import time_offset
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+# OMNI fill values (one per column format: N 999.9, V 9999., T 9999999., ...); masked only where they match exactly:
+fill_values = (99.99, 999.9, 999.99, 9999.0, 9999.99, 99999.0, 99999.9, 99999.99, 999999.0, 999999.99, 9999999.0, 9999999.9)
+date_columns = ['Year', 'Month', 'Day', 'Hour', 'Minute']
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Loading. Both return (times datetime64[ms], values); simulated values have shape (rows, samples):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+# Observed CSV with a time column (any format pandas parses), or OMNI-style YEAR, DOY, HR[, MN] columns:
+def load_observed(path, column, time_column=None, sep=None, fill=fill_values):
+    import pandas as pd
+
+    df = pd.read_csv(path, sep=sep, engine='python')
+    columns = {name.upper(): name for name in df.columns}
+
+    if time_column is not None:
+        times = pd.to_datetime(df[time_column]).to_numpy(dtype='datetime64[ms]')
+    elif {'YEAR', 'DOY', 'HR'} <= set(columns):
+        days = df[columns['YEAR']].astype(int).astype(str).str.zfill(4).to_numpy(dtype='datetime64[Y]').astype('datetime64[D]')
+        times = days + (df[columns['DOY']].to_numpy() - 1).astype('timedelta64[D]')
+        minutes = df[columns['HR']].to_numpy() * 60 + (df[columns['MN']].to_numpy() if 'MN' in columns else 0)
+        times = times.astype('datetime64[ms]') + minutes.astype('timedelta64[m]')
+    else:
+        raise ValueError(f"{path}: give time_column, or provide YEAR, DOY and HR columns")
+
+    values = df[column].to_numpy(dtype=float, copy=True)
+    values[np.isin(values, fill)] = np.nan
+    return times, values
+
+# Simulated distances written by reading_spiral_data_v3.py (Distance_Row_* then Day, Month, Year, Hour, Minute), or the
+# DataFrame returned by spiral_log.simulated_distances():
+def load_simulated(source):
+    import pandas as pd
+
+    df = pd.read_csv(source, sep='\t', dtype={name: str for name in date_columns}) if isinstance(source, str) else source
+    if isinstance(df.index, pd.DatetimeIndex):
+        times = df.index.to_numpy(dtype='datetime64[ms]')
+    else:
+        times = pd.to_datetime(df[date_columns].astype(int).rename(columns=str.lower)).to_numpy(dtype='datetime64[ms]')
+
+    rows = [name for name in df.columns if name.startswith('Distance_Row_')]
+    return times, df[rows].to_numpy(dtype=float).T, rows
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Resampling onto a regular grid (start + k * cadence). Grid points between samples more than max_gap_hours apart, or outside the
+# samples, are NaN. values may have shape (samples,) or (rows, samples) with NaN holes:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def resample(times, values, start, n_samples, cadence_hours, max_gap_hours=6.0):
+    times = ((np.asarray(times, dtype='datetime64[ms]') - np.datetime64(start, 'ms')) / np.timedelta64(1, 'h')).astype(float)
+    grid = np.arange(n_samples) * cadence_hours
+    values = np.atleast_2d(values)
+
+    result = np.full((len(values), n_samples), np.nan)
+    for i, row in enumerate(values):
+        valid = np.isfinite(row)
+        t, v = times[valid], row[valid]
+        if len(t) < 2:
+            continue
+        result[i] = np.interp(grid, t, v, left=np.nan, right=np.nan)
+
+        after = np.clip(np.searchsorted(t, grid), 1, len(t) - 1)
+        gap = (t[after] - t[after - 1]) > max_gap_hours
+        result[i, gap & (grid > t[after - 1]) & (grid < t[after])] = np.nan
+    return result
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Pearson correlation at every lag between one observed series (n_obs,) and many simulated rows (rows, n_sim), both on the same
+# grid. Returns k (lags in samples: observed index - simulated index), r (rows, lags) and the overlap (rows, lags); lags with
+# fewer than min_overlap common samples (default: half the simulated series) give NaN.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class ObservedSpectrum:
+
+    def __init__(self, observed, n_sim):
+        observed = np.asarray(observed, dtype=float)
+        self.n_obs, self.n_sim = len(observed), n_sim
+        self.nfft = 1 << (self.n_obs + n_sim - 2).bit_length()
+
+        mask = np.isfinite(observed)
+        values = np.where(mask, observed - np.nanmean(observed), 0.0)
+        self.mask = np.fft.rfft(mask.astype(float), self.nfft)
+        self.x = np.fft.rfft(values, self.nfft)
+        self.xx = np.fft.rfft(values ** 2, self.nfft)
+
+        # Lags k = -(n_sim - 1) ... n_obs - 1 sit at k mod nfft in the circular correlation:
+        self.k = np.arange(-(n_sim - 1), self.n_obs)
+
+    def _xcorr(self, a, b):
+        return np.fft.irfft(a * np.conj(b), self.nfft)[..., self.k % self.nfft]
+
+    def correlate(self, simulated, min_overlap=None):
+        simulated = np.atleast_2d(np.asarray(simulated, dtype=float))
+        min_overlap = self.n_sim // 2 if min_overlap is None else min_overlap
+        mask = np.isfinite(simulated)
+        values = np.where(mask, simulated - np.nanmean(np.where(mask, simulated, np.nan), axis=1, keepdims=True), 0.0)
+
+        y_mask = np.fft.rfft(mask.astype(float), self.nfft)
+        y = np.fft.rfft(values, self.nfft)
+        yy = np.fft.rfft(values ** 2, self.nfft)
+
+        # The mask terms are shared by every row when the simulated rows have no gaps:
+        common = mask.all()
+        mask_terms = y_mask[:1] if common else y_mask
+
+        n = np.round(self._xcorr(self.mask, mask_terms))
+        sx = self._xcorr(self.x, mask_terms)
+        sxx = self._xcorr(self.xx, mask_terms)
+        sy = self._xcorr(self.mask, y)
+        syy = self._xcorr(self.mask, yy)
+        sxy = self._xcorr(self.x, y)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = sxy - sx * sy / n
+            variance = (sxx - sx ** 2 / n) * (syy - sy ** 2 / n)
+            r = covariance / np.sqrt(np.clip(variance, 0, None))
+        r[np.broadcast_to(n < min_overlap, r.shape)] = np.nan
+        return self.k, r, np.broadcast_to(n, r.shape)
+
+def lagged_correlation(observed, simulated, min_overlap=None):
+    return ObservedSpectrum(observed, np.shape(simulated)[-1]).correlate(simulated, min_overlap)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Best lag of every row, with lags in hours (|lag| <= max_lag_hours when given):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def _best(k, r, overlap, offset_hours, cadence_hours, max_lag_hours):
+    lag_hours = offset_hours + k * cadence_hours
+    if max_lag_hours is not None:
+        r = np.where(np.abs(lag_hours) <= max_lag_hours, r, np.nan)
+
+    usable = np.isfinite(r).any(axis=1)
+    best = np.argmax(np.where(np.isfinite(r), r, -np.inf), axis=1)
+    rows = np.arange(len(r))
+    return (np.where(usable, lag_hours[best], np.nan), np.where(usable, r[rows, best], np.nan),
+            np.where(usable, overlap[rows, best], 0).astype(int))
+
+class _Grid:
+
+    def __init__(self, observed_times, observed_values, cadence_hours, max_gap_hours, max_lag_hours):
+        self.observed_times = np.asarray(observed_times, dtype='datetime64[ms]')
+        self.observed_values = observed_values
+        self.cadence_hours = cadence_hours
+        self.max_gap_hours = max_gap_hours
+        self.max_lag_hours = max_lag_hours
+
+    def _resample(self, times, values, start, stop):
+        n_samples = int(((stop - start) / np.timedelta64(1, 'h')) // self.cadence_hours) + 1
+        return resample(times, values, start, n_samples, self.cadence_hours, self.max_gap_hours)
+
+    # Observed series for simulated times: the whole series, or only the stretch reachable within max_lag_hours (which keeps the
+    # FFTs short when years of data are scored). Returns (values, lag in hours of k = 0):
+    def observed(self, times):
+        times = np.asarray(times, dtype='datetime64[ms]')
+        if self.max_lag_hours is None:
+            start, stop = self.observed_times.min(), self.observed_times.max()
+        else:
+            lag = np.timedelta64(int(round(self.max_lag_hours * 3.6e6)), 'ms')
+            start, stop = times.min() - lag, times.max() + lag
+        values = self._resample(self.observed_times, self.observed_values, start, stop)[0]
+        return values, (start - times.min()) / np.timedelta64(1, 'h')
+
+    # Simulated rows on the same cadence, starting at their own first time:
+    def simulated(self, times, values):
+        times = np.asarray(times, dtype='datetime64[ms]')
+        return self._resample(times, values, times.min(), times.max())
+
+# Best lag and correlation of every Distance_Row_* column. simulated is a path or a simulated_distances DataFrame:
+def match_distances(observed_times, observed_values, simulated, cadence_hours=1.0, max_lag_hours=None, sign=-1, min_overlap=None,
+                    max_gap_hours=6.0):
+    import pandas as pd
+
+    grid = _Grid(observed_times, observed_values, cadence_hours, max_gap_hours, max_lag_hours)
+    times, values, rows = load_simulated(simulated)
+    observed, offset_hours = grid.observed(times)
+
+    k, r, overlap = lagged_correlation(observed, grid.simulated(times, sign * values), min_overlap)
+    lag_hours, correlation, overlap = _best(k, r, overlap, offset_hours, cadence_hours, max_lag_hours)
+    return pd.DataFrame({'lag_hours': lag_hours, 'correlation': correlation, 'overlap': overlap}, index=pd.Index(rows, name='Row'))
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Score a whole parameter sweep (parameter_sweep.SweepResult, frames at time_offset hours from obstime): the best point, lag and
+# correlation of every run. Runs are processed block_points simulated points at a time against one observed FFT:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def score_sweep(observed_times, observed_values, sweep, obstime, stream='fast', cadence_hours=1.0, max_lag_hours=None, sign=-1,
+                min_overlap=None, max_gap_hours=6.0, block_points=512, time_offset=time_offset):
+    import pandas as pd
+
+    from parameter_sweep import param_names
+
+    grid = _Grid(observed_times, observed_values, cadence_hours, max_gap_hours, max_lag_hours)
+    distances = sweep.distances[stream]                                          # (frames, total points)
+    times = np.datetime64(obstime, 'ms') + np.round(np.arange(len(distances)) * time_offset * 3.6e6).astype('timedelta64[ms]')
+
+    observed, offset_hours = grid.observed(times)
+    spectrum = ObservedSpectrum(observed, grid.simulated(times, distances[:, :1].T).shape[1])
+
+    lag_hours, correlation, overlap = [], [], []
+    for first in range(0, distances.shape[1], block_points):
+        k, r, n = spectrum.correlate(grid.simulated(times, sign * distances[:, first:first + block_points].T), min_overlap)
+        best = _best(k, r, n, offset_hours, cadence_hours, max_lag_hours)
+        lag_hours.append(best[0])
+        correlation.append(best[1])
+        overlap.append(best[2])
+    lag_hours, correlation, overlap = np.concatenate(lag_hours), np.concatenate(correlation), np.concatenate(overlap)
+
+    # Best point of each run:
+    table = []
+    for i, params in enumerate(sweep.params):
+        points = slice(sweep.offsets[i], sweep.offsets[i + 1])
+        scores = np.where(np.isfinite(correlation[points]), correlation[points], -np.inf)
+        point = int(np.argmax(scores))
+        table.append(dict(zip(param_names, params), best_point=point, lag_hours=lag_hours[points][point],
+                          correlation=correlation[points][point], overlap=overlap[points][point]))
+    return pd.DataFrame(table).sort_values('correlation', ascending=False, ignore_index=True)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Match simulated distances against an observed time series by cross-correlation.')
+    parser.add_argument('observed', help='observed CSV (time column, or OMNI-style YEAR, DOY, HR columns)')
+    parser.add_argument('--column', required=True, help='observed quantity, e.g. V')
+    parser.add_argument('--time-column', dest='time_column')
+    parser.add_argument('--fill', type=float, nargs='+', default=fill_values, help='fill values of the observed column (exact)')
+    parser.add_argument('--simulated', help='simulated_distances file written by reading_spiral_data_v3.py')
+    parser.add_argument('--sweep', help='parameter_sweep.py output (.npz)')
+    parser.add_argument('--obstime', help='obstime of the sweep runs')
+    parser.add_argument('--stream', default='fast', choices=['slow', 'fast'])
+    parser.add_argument('--cadence', type=float, default=1.0, help='common grid cadence in hours')
+    parser.add_argument('--max-lag', dest='max_lag', type=float, default=None, help='largest |lag| in hours')
+    parser.add_argument('--sign', type=int, default=-1, choices=[-1, 1])
+    parser.add_argument('--min-overlap', dest='min_overlap', type=int, default=None, help='fewest common samples of a lag')
+    parser.add_argument('--output', default='matches.csv')
+    args = parser.parse_args()
+
+    observed_times, observed_values = load_observed(args.observed, args.column, args.time_column, fill=args.fill)
+    if args.sweep:
+        if args.obstime is None:
+            parser.error('--sweep needs --obstime')
+        from parameter_sweep import load_sweep
+        result = score_sweep(observed_times, observed_values, load_sweep(args.sweep), args.obstime, args.stream, args.cadence,
+                             args.max_lag, args.sign, args.min_overlap)
+    elif args.simulated:
+        result = match_distances(observed_times, observed_values, args.simulated, args.cadence, args.max_lag, args.sign,
+                                 args.min_overlap)
+    else:
+        parser.error('give --simulated or --sweep')
+
+    result.to_csv(args.output)
+    print(result.head(20))
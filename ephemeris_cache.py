@@ -0,0 +1,308 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Persistent on-disk ephemeris cache for Horizons (STEREO-A/B, ...) and planetary positions.
+#
+# Positions are stored as heliographic Stonyhurst cartesian (x, y, z) in AU, sampled on a regular grid of Julian dates (UTC),
+# one .npz file per body and time span. Times inside a cached span are served by interpolation, with no network access.
+#
+# Missing spans are fetched concurrently (a bounded thread pool, with retries), so a whole constellation of spacecraft costs about
+# as much wall time as a single request.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import argparse
+import glob
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import numpy as np
+
+from profiling import profiler, stage
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+planets = ['mercury', 'venus', 'earth', 'moon', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune']
+
+# Horizons command of the bodies whose names are ambiguous there:
+body_ids = {'mercury': '199', 'venus': '299', 'earth': '399', 'moon': '301', 'mars': '499', 'jupiter': '599', 'saturn': '699',
+            'uranus': '799', 'neptune': '899'}
+
+horizons_url = 'https://ssd.jpl.nasa.gov/api/horizons.api'
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Fetcher that asks sunpy (local planetary ephemeris or JPL Horizons over the network):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class SunpyFetcher:
+
+    def fetch(self, body, jd):
+        from astropy.time import Time
+        from sunpy.coordinates import get_body_heliographic_stonyhurst, get_horizons_coord
+
+        times = Time(jd, format='jd', scale='utc')
+        if body.lower() in planets:
+            coord = get_body_heliographic_stonyhurst(body.lower(), times)
+        else:
+            coord = get_horizons_coord(body, times)
+        return coord.cartesian.xyz.to_value('AU').reshape(3, -1)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Fetcher that calls the Horizons API directly (base_url can point to a mirror or to ephemeris_server.py).
+#
+# Vectors are requested in ICRF from the solar system barycentre, as sunpy does, and converted to Stonyhurst with astropy. Long time
+# lists are split into requests of max_times epochs, which fetch_concurrently() runs in parallel.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class HorizonsFetcher:
+
+    def __init__(self, base_url=horizons_url, timeout=30, max_times=200):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_times = max_times
+
+    def query(self, body, jd):
+        return {'format': 'json',
+                'COMMAND': f"'{body_ids.get(body.lower(), body)}'",
+                'MAKE_EPHEM': "'YES'",
+                'EPHEM_TYPE': "'VECTORS'",
+                'CENTER': "'500@0'",
+                'REF_PLANE': "'FRAME'",
+                'REF_SYSTEM': "'ICRF'",
+                'TIME_TYPE': "'UT'",
+                'TLIST_TYPE': "'JD'",
+                'TLIST': ' '.join(f"'{value:.9f}'" for value in jd),
+                'OUT_UNITS': "'AU-D'",
+                'VEC_TABLE': "'1'",
+                'CSV_FORMAT': "'YES'"}
+
+    # ICRF cartesian vectors (3, n) [AU] between the $$SOE and $$EOE markers of a Horizons reply:
+    def parse(self, body, reply):
+        text = json.loads(reply).get('result', '')
+        if '$$SOE' not in text:
+            raise LookupError(f"Horizons returned no ephemeris for {body}: {text.strip()[:200]}")
+        rows = text.split('$$SOE')[1].split('$$EOE')[0].strip().splitlines()
+        return np.array([[float(value) for value in row.split(',')[2:5]] for row in rows]).T
+
+    def fetch(self, body, jd):
+        import astropy.units as u
+        from astropy.coordinates import ICRS, CartesianRepresentation, SkyCoord
+        from astropy.time import Time
+        from sunpy.coordinates import HeliographicStonyhurst
+
+        jd = np.atleast_1d(jd)
+        with urlopen(f"{self.base_url}?{urlencode(self.query(body, jd))}", timeout=self.timeout) as response:
+            xyz = self.parse(body, response.read())
+
+        coord = SkyCoord(ICRS(CartesianRepresentation(xyz * u.AU)))
+        coord = coord.transform_to(HeliographicStonyhurst(obstime=Time(jd, format='jd', scale='utc')))
+        return coord.cartesian.xyz.to_value('AU').reshape(3, -1)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Fetch many (body, Julian dates) requests with at most max_workers in flight. Network errors, timeouts and 5xx replies are retried
+# with exponential backoff; 4xx replies (a bad query will not get better) and anything else (e.g. an unknown body) fail at once.
+# Returns the (3, n) arrays in request order:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def fetch_with_retries(fetcher, body, jd, retries=3, backoff=1.0):
+    for attempt in range(retries + 1):
+        try:
+            return fetcher.fetch(body, jd)
+        except OSError as error:
+            if attempt == retries or isinstance(error, HTTPError) and 400 <= error.code < 500:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+def fetch_concurrently(fetcher, requests, max_workers=8, retries=3, backoff=1.0):
+    max_times = getattr(fetcher, 'max_times', None)
+
+    # Split long time lists into the pieces the fetcher accepts in one request:
+    pieces, owners = [], []
+    for i, (body, jd) in enumerate(requests):
+        jd = np.atleast_1d(jd)
+        for start in range(0, len(jd), max_times or len(jd)):
+            pieces.append((body, jd[start:start + (max_times or len(jd))]))
+            owners.append(i)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pieces)))) as pool:
+        jobs = [pool.submit(fetch_with_retries, fetcher, body, jd, retries, backoff) for body, jd in pieces]
+        results = [job.result() for job in jobs]
+
+    owners = np.array(owners)
+    return [np.concatenate([results[j] for j in np.flatnonzero(owners == i)], axis=1) for i in range(len(requests))]
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# File-backed stand-in for Horizons: one CSV table per body (jd, x, y, z in AU), e.g. for tests and air-gapped nodes:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class LocalEphemeris:
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.calls = 0
+
+    def _path(self, body):
+        return os.path.join(self.directory, f"{_safe_name(body)}.csv")
+
+    def save(self, body, jd, xyz):
+        os.makedirs(self.directory, exist_ok=True)
+        table = np.column_stack((np.atleast_1d(jd), np.reshape(xyz, (3, -1)).T))
+        np.savetxt(self._path(body), table, delimiter=',', header='jd,x,y,z', fmt='%.10f')
+
+    def fetch(self, body, jd):
+        self.calls += 1
+        path = self._path(body)
+        if not os.path.exists(path):
+            raise LookupError(f"No local ephemeris table for {body} in {self.directory}")
+
+        table = np.atleast_2d(np.loadtxt(path, delimiter=','))
+        jd = np.atleast_1d(jd)
+        if jd.min() < table[0, 0] or jd.max() > table[-1, 0]:
+            raise LookupError(f"Local ephemeris for {body} does not cover JD {jd.min()} - {jd.max()}")
+        return np.array([np.interp(jd, table[:, 0], table[:, i]) for i in (1, 2, 3)])
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# The cache itself:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def _safe_name(body):
+    return re.sub(r'[^0-9A-Za-z]+', '_', body).strip('_').lower()
+
+class EphemerisCache:
+
+    def __init__(self, cache_dir='ephemeris_cache', fetcher=None, offline=False, step_days=1.0, max_workers=8, retries=3):
+        self.cache_dir = cache_dir
+        self.fetcher = fetcher if fetcher is not None else SunpyFetcher()
+        self.offline = offline
+        self.step_days = step_days
+        self.max_workers = max_workers
+        self.retries = retries
+        self._spans = {}
+
+    # Cached spans of one body, as a list of (jd_start, jd_stop, path):
+    def spans(self, body):
+        if body not in self._spans:
+            spans = []
+            for path in glob.glob(os.path.join(self.cache_dir, f"{_safe_name(body)}__*.npz")):
+                start, stop = os.path.basename(path)[:-4].split('__')[1].split('_')
+                spans.append((float(start), float(stop), path))
+            self._spans[body] = sorted(spans)
+        return self._spans[body]
+
+    # Regular grid of Julian dates covering [jd_start, jd_stop]:
+    def _grid(self, jd_start, jd_stop, step_days):
+        first = np.floor(jd_start / step_days) * step_days
+        n_steps = int(np.ceil((jd_stop - first) / step_days - 1e-9))
+        return first + np.arange(n_steps + 1) * step_days
+
+    # Fetch a regular grid covering [jd_start, jd_stop] and store it as a new span:
+    def _store(self, body, jd_start, jd_stop, step_days):
+        if self.offline:
+            raise LookupError(f"Ephemeris for {body} (JD {jd_start} - {jd_stop}) is not cached and the cache is offline")
+        jd = self._grid(jd_start, jd_stop, step_days)
+        with stage('ephemeris_fetch'):
+            xyz = self.fetcher.fetch(body, jd)
+        return self._save(body, jd, xyz)
+
+    def _save(self, body, jd, xyz):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, f"{_safe_name(body)}__{jd[0]:.6f}_{jd[-1]:.6f}.npz")
+
+        # Write a temporary file first, so other processes sharing the cache never list or load a half-written span:
+        descriptor, staging = tempfile.mkstemp(dir=self.cache_dir, prefix='.staging_', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez(file, jd=jd, xyz=xyz)
+            os.replace(staging, path)
+        except BaseException:
+            os.remove(staging)
+            raise
+        self.spans(body).append((jd[0], jd[-1], path))
+        self._spans[body].sort()
+        return path
+
+    # Make sure every (body, Julian dates) request is cached, fetching the missing spans concurrently (one span per body):
+    def ensure(self, requests, step_days=None):
+        missing = {}
+        for body, jd in requests:
+            jd = np.atleast_1d(np.asarray(jd, dtype=float))
+            if self._find(body, jd.min(), jd.max()) is None:
+                jd_start, jd_stop = missing.get(body, (jd.min(), jd.max()))
+                missing[body] = (min(jd_start, jd.min()), max(jd_stop, jd.max()))
+        if not missing:
+            return
+
+        if self.offline:
+            raise LookupError(f"Ephemerides for {', '.join(missing)} are not cached and the cache is offline")
+        grids = [(body, self._grid(jd_start, jd_stop, step_days or self.step_days)) for body, (jd_start, jd_stop) in missing.items()]
+        with stage('ephemeris_fetch'):
+            results = fetch_concurrently(self.fetcher, grids, self.max_workers, self.retries)
+        for (body, jd), xyz in zip(grids, results):
+            self._save(body, jd, xyz)
+
+    # Download a whole campaign's date range once:
+    def prefetch(self, bodies, start, stop, step_days=None):
+        jd_start, jd_stop = _to_jd(start), _to_jd(stop)
+        self.ensure([(body, [jd_start, jd_stop]) for body in bodies], step_days)
+
+    def _find(self, body, jd_start, jd_stop):
+        for start, stop, path in self.spans(body):
+            if start <= jd_start and jd_stop <= stop:
+                return path
+        return None
+
+    # Heliographic Stonyhurst cartesian positions (3, n) [AU] for Julian dates (UTC):
+    @profiler.wrap('ephemeris_lookup')
+    def lookup(self, body, jd):
+        jd = np.atleast_1d(np.asarray(jd, dtype=float))
+        path = self._find(body, jd.min(), jd.max())
+        if path is None:
+            path = self._store(body, jd.min(), jd.max(), self.step_days)
+
+        with np.load(path) as data:
+            span_jd, xyz = data['jd'], data['xyz']
+        return np.array([np.interp(jd, span_jd, component) for component in xyz])
+
+    # Same as get_body_heliographic_stonyhurst / get_horizons_coord, served from the cache:
+    def get(self, body, times):
+        import astropy.units as u
+        from astropy.coordinates import CartesianRepresentation, SkyCoord
+        from sunpy.coordinates import HeliographicStonyhurst
+
+        xyz = self.lookup(body, times.utc.jd)
+        if times.isscalar:
+            xyz = xyz[:, 0]
+        coord = SkyCoord(CartesianRepresentation(xyz * u.AU), frame=HeliographicStonyhurst(obstime=times))
+        coord.representation_type = 'spherical'
+        return coord
+
+def _to_jd(time):
+    if isinstance(time, (int, float)):
+        return float(time)
+    from sunpy.time import parse_time
+    return parse_time(time).utc.jd
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Prefetch from the command line, e.g.:  python ephemeris_cache.py 2008-01-01 2009-12-31 Earth STEREO-A STEREO-B
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prefetch ephemerides into the local cache.')
+    parser.add_argument('start')
+    parser.add_argument('stop')
+    parser.add_argument('bodies', nargs='+')
+    parser.add_argument('--cache-dir', default='ephemeris_cache')
+    parser.add_argument('--step-days', type=float, default=1.0)
+    parser.add_argument('--horizons-url', help='query this Horizons API endpoint directly instead of going through sunpy')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent requests')
+    args = parser.parse_args()
+
+    fetcher = HorizonsFetcher(args.horizons_url) if args.horizons_url else None
+    EphemerisCache(args.cache_dir, fetcher, step_days=args.step_days, max_workers=args.workers).prefetch(args.bodies, args.start,
+                                                                                                       args.stop)
@@ -0,0 +1,105 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Local stand-in for the Horizons API, serving the LocalEphemeris CSV tables of a directory, for tests and air-gapped nodes:
+#
+#   python ephemeris_server.py ephemeris_tables --port 8765 --delay 0.5
+#   python ephemeris_cache.py 2008-01-01 2009-12-31 Earth STEREO-A STEREO-B --horizons-url http://127.0.0.1:8765/api/horizons.api
+#
+# Replies follow the Horizons vector table layout read by ephemeris_cache.HorizonsFetcher (ICRF, barycentric, AU). delay adds a
+# fixed latency to every request, to mimic the real service when timing concurrent fetches.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from ephemeris_cache import LocalEphemeris, body_ids
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+body_names = {command: body for body, command in body_ids.items()}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Stonyhurst positions of the tables -> ICRF barycentric vectors (3, n) [AU]:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def icrf_vectors(ephemeris, body, jd):
+    import astropy.units as u
+    from astropy.coordinates import ICRS, CartesianRepresentation, SkyCoord
+    from astropy.time import Time
+    from sunpy.coordinates import HeliographicStonyhurst
+
+    coord = SkyCoord(CartesianRepresentation(ephemeris.fetch(body, jd) * u.AU),
+                     frame=HeliographicStonyhurst(obstime=Time(jd, format='jd', scale='utc')))
+    return coord.transform_to(ICRS()).cartesian.xyz.to_value('AU').reshape(3, -1)
+
+def horizons_reply(ephemeris, query):
+    command = query['COMMAND'][0].strip("'")
+    body = body_names.get(command, command)
+    jd = np.array([float(value.strip("'")) for value in query['TLIST'][0].split()])
+
+    try:
+        xyz = icrf_vectors(ephemeris, body, jd)
+    except LookupError as error:
+        return {'result': f"No ephemeris for target \"{command}\": {error}\n"}
+
+    rows = [f"{t:.9f}, A.D., {x:.16E}, {y:.16E}, {z:.16E}," for t, (x, y, z) in zip(jd, xyz.T)]
+    return {'signature': {'source': 'SIRs local ephemeris stand-in'},
+            'result': '\n'.join(['$$SOE'] + rows + ['$$EOE']) + '\n'}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# The server (one thread per request, like the concurrent clients expect):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class HorizonsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        try:
+            reply = horizons_reply(self.server.ephemeris, parse_qs(urlparse(self.path).query))
+        except (KeyError, ValueError) as error:
+            self.send_error(400, f"Bad Horizons query: {error}")
+            return
+
+        body = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_server(directory, host='127.0.0.1', port=0, delay=0.0):
+    server = ThreadingHTTPServer((host, port), HorizonsHandler)
+    server.ephemeris = LocalEphemeris(directory)
+    server.delay = delay
+    server.url = f"http://{host}:{server.server_address[1]}/api/horizons.api"
+    return server
+
+# Serve from a background thread (port=0 picks a free port); stop with server.shutdown():
+def start_server(directory, host='127.0.0.1', port=0, delay=0.0):
+    server = make_server(directory, host, port, delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve local ephemeris tables through a Horizons-like API.')
+    parser.add_argument('directory', help='directory of LocalEphemeris CSV tables')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds added to every reply')
+    args = parser.parse_args()
+
+    server = make_server(args.directory, args.host, args.port, args.delay)
+    print(f"Serving {args.directory} at {server.url}")
+    server.serve_forever()
@@ -0,0 +1,182 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Run the model for a whole catalog of SIR events on a process pool.
+#
+# The catalog is a CSV with an obstime column, an optional event column (a name) and optionally any of the model parameters
+# (v_sw_slow, v_sw_fast, r_min, r_max, n_points, angle2Earth, frames, cadence) per event:
+#
+#   event,obstime,v_sw_slow,angle2Earth
+#   SIR-001,2008-01-23 16:39:00,294,-46
+#   SIR-002,2008-02-19 08:10:00,310,-40
+#
+# Every event goes through the ephemeris lookup, the spiral computation and the distance extraction, and the results are merged
+# into one table in the simulated_distances layout of reading_spiral_data_v3.py, with an Event column in front (plus the closest
+# approach to each spacecraft when the ephemerides are used). Events that fail are listed in <output>.failures.csv and do not stop
+# the others. The ephemerides of the whole catalog are fetched once in the parent, so the workers only read the shared cache.
+#
+#   python event_catalog.py events.csv --output catalog_distances.txt --rows 15 20 25 30 35 40 45
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import argparse
+import csv
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from spiral_model import SpiralModel
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+default_rows = [15, 20, 25, 30, 35, 40, 45]                                     # Same rows as reading_spiral_data_v3.py
+
+param_columns = {'v_sw_slow': float, 'v_sw_fast': float, 'r_min': float, 'r_max': float, 'n_points': int, 'angle2Earth': float,
+                 'frames': int, 'cadence': float}
+
+failure_columns = ['Event', 'obstime', 'error']
+
+unix_epoch = np.datetime64('1970-01-01T00:00', 'ms')
+unix_epoch_jd = 2440587.5
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Catalog: list of {'event', 'obstime', params...} dicts (empty cells keep the default value):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def read_catalog(path):
+    events = []
+    with open(path, newline='') as file:
+        for number, row in enumerate(csv.DictReader(file), start=1):
+            row = {key.strip().lower(): value.strip() for key, value in row.items() if key is not None and value}
+            if 'obstime' not in row:
+                raise ValueError(f"{path}: event {number} has no obstime")
+            event = {'event': row.get('event', str(number)), 'obstime': row['obstime']}
+            event.update({key: cast(row[key]) for key, cast in param_columns.items() if key in row})
+            events.append(event)
+    return events
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# One event (executed in the worker processes). Returns (event, simulated_distances table or None, error or None):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def run_event(event, rows=default_rows, stream='fast', ephemeris_options=None):
+    try:
+        from sirs_cli import parse_obstime
+        from spiral_log import simulated_distances
+
+        params = {key: value for key, value in event.items() if key in param_columns and key != 'frames'}
+        model = SpiralModel(n_frames=event.get('frames', 360), obstime=parse_obstime(event['obstime']), **params)
+
+        # Times at the minute resolution of the text logs:
+        log = {'time': model.times.astype('datetime64[m]'), 'distance': model.distances[stream]}
+        df = simulated_distances(log, rows)
+        df.insert(0, 'Event', event['event'])
+
+        if ephemeris_options is not None:
+            for body, distance in spacecraft_distances(model, stream, **ephemeris_options).items():
+                df.insert(df.columns.get_loc('Day'), f"Distance_{body}", distance)
+
+        return event, df, None
+
+    except Exception as error:
+        return event, None, f"{type(error).__name__}: {error}\n{traceback.format_exc(limit=3)}"
+
+# Closest approach of the spiral to each spacecraft per frame, from the ephemeris cache:
+def spacecraft_distances(model, stream, cache_dir='ephemeris_cache', offline=False):
+    from sunpy.time import parse_time
+
+    from ephemeris_cache import EphemerisCache
+    from hee_coords import hee_background, hee_observers, planets
+
+    background = hee_background(parse_time(str(model.obstime)), EphemerisCache(cache_dir, offline=offline))
+    observers = {body: xy for body, xy in hee_observers(background).items() if body not in planets}
+    if not observers:
+        return {}
+
+    distance, index = model.index[stream].nearest(list(observers.values()), model.theta_values)
+    return {body: distance[:, i] for i, body in enumerate(observers)}
+
+# Fetch the ephemerides covering every event (planet orbits included) into the cache before the workers start. Events with an
+# unreadable obstime are left to run_event, which reports them:
+def prefetch_ephemerides(events, cache_dir='ephemeris_cache', offline=False):
+    from ephemeris_cache import EphemerisCache
+    from hee_coords import orbit_days, planets, spacecraft
+    from sirs_cli import parse_obstime
+
+    jd = []
+    for event in events:
+        try:
+            jd.append((parse_obstime(event['obstime']) - unix_epoch) / np.timedelta64(1, 'D') + unix_epoch_jd)
+        except ValueError:
+            pass
+    if offline or not jd:
+        return
+
+    requests = [(planet, [min(jd), max(jd) + orbit_days]) for planet in planets]
+    requests += [(body, [min(jd), max(jd)]) for label, body in spacecraft]
+    try:
+        EphemerisCache(cache_dir).ensure(requests)
+    except (OSError, LookupError) as error:                                      # The workers then fetch their own spans
+        print(f"Ephemeris prefetch failed: {error}")
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# The whole catalog:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def run_catalog(events, rows=default_rows, stream='fast', processes=None, ephemeris_options=None, output=None):
+    import pandas as pd
+
+    processes = min(processes or os.cpu_count(), max(len(events), 1))
+    tables, failures = [], []
+
+    if ephemeris_options is not None:
+        prefetch_ephemerides(events, **ephemeris_options)
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        jobs = [pool.submit(run_event, event, rows, stream, ephemeris_options) for event in events]
+        for event, job in zip(events, jobs):
+            try:
+                event, df, error = job.result()
+            except Exception as crash:                                           # e.g. a worker killed by the system
+                df, error = None, f"{type(crash).__name__}: {crash}"
+            if df is not None:
+                tables.append(df)
+            else:
+                failures.append({'Event': event['event'], 'obstime': event['obstime'], 'error': error.strip()})
+
+    merged = pd.concat(tables) if tables else pd.DataFrame(columns=['Event'])
+
+    if output is not None:
+        merged.to_csv(output, header=True, index=None, sep='\t', mode='w', float_format='%.3f')
+        if failures:
+            with open(f"{output}.failures.csv", 'w', newline='') as file:
+                writer = csv.DictWriter(file, failure_columns)
+                writer.writeheader()
+                writer.writerows(failures)
+        elif os.path.exists(f"{output}.failures.csv"):
+            os.remove(f"{output}.failures.csv")                                  # Left over from an earlier run
+
+    return merged, failures
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the SIR spiral model for a catalog of events.')
+    parser.add_argument('catalog', help='CSV with an obstime column (and optionally event and model parameter columns)')
+    parser.add_argument('--output', default='catalog_distances.txt')
+    parser.add_argument('--rows', nargs='+', type=int, default=default_rows)
+    parser.add_argument('--stream', default='fast', choices=['slow', 'fast'])
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--no-ephemeris', dest='ephemeris', action='store_false', help='skip the spacecraft distances')
+    parser.add_argument('--offline', action='store_true', help='never fetch ephemerides from the network')
+    parser.add_argument('--ephemeris-cache', dest='ephemeris_cache', default='ephemeris_cache')
+    args = parser.parse_args()
+
+    events = read_catalog(args.catalog)
+    ephemeris_options = {'cache_dir': args.ephemeris_cache, 'offline': args.offline} if args.ephemeris else None
+    merged, failures = run_catalog(events, args.rows, args.stream, args.processes, ephemeris_options, args.output)
+
+    print(f"{len(events) - len(failures)} of {len(events)} events saved to {args.output}")
+    for failure in failures:
+        print(f"  {failure['Event']} ({failure['obstime']}) failed: {failure['error'].splitlines()[0]}")
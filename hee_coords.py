@@ -0,0 +1,98 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# HEE positions of the planets and spacecraft drawn behind the spirals (needs astropy and sunpy).
+#
+# All the bodies of an epoch go through a single batched HGS -> HEE transform, and the result is cached per obstime.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import numpy as np
+
+import astropy.units as u
+from astropy.coordinates import CartesianRepresentation, SkyCoord
+from astropy.time import Time
+
+from sunpy.coordinates import HeliocentricEarthEcliptic, HeliographicStonyhurst
+
+from profiling import profiler, stage
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+planets = ['Earth']
+spacecraft = [('A', 'STEREO-A'), ('B', 'STEREO-B')]
+
+orbit_days = 700                                                                 # Longest span searched for the end of the first orbit
+coarse_step = 16                                                                 # Days between the samples used to bracket that end
+
+_background_cache = {}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# One transform for many (body, Julian dates) requests; returns the HEE (x, y) [AU] of each request:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def batch_to_hee(ephemeris, requests, hee_frame):
+    ephemeris.ensure(requests)                                                   # Fetch whatever is missing concurrently
+    xyz = [ephemeris.lookup(body, jd) for body, jd in requests]
+    jd = np.concatenate([np.atleast_1d(jd) for body, jd in requests])
+
+    with stage('hee_transform'):
+        coord = SkyCoord(CartesianRepresentation(np.concatenate(xyz, axis=1) * u.AU),
+                         frame=HeliographicStonyhurst(obstime=Time(jd, format='jd', scale='utc')))
+        hee = coord.transform_to(hee_frame).cartesian
+        x, y = hee.x.to_value('AU'), hee.y.to_value('AU')
+
+    bounds = np.cumsum([0] + [block.shape[1] for block in xyz])
+    return [(x[start:stop], y[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+# Number of samples before the HEE longitude wraps around (the first orbit), or all of them:
+def first_orbit_length(x, y):
+    shifted = (np.arctan2(y, x) - np.arctan2(y[0], x[0])) % (2 * np.pi)
+    ends = np.flatnonzero(np.diff(shifted) < 0)
+    if ends.size > 0:
+        return ends[0]
+    return len(x)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Orbits, planets and spacecraft at obstime as plain arrays, ready for spiral_plot.setup_figure():
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+@profiler.wrap('background')
+def hee_background(obstime, ephemeris, planets=planets, spacecraft=spacecraft):
+    key = (obstime.utc.isot, tuple(planets), tuple(spacecraft))
+    if key in _background_cache:
+        return _background_cache[key]
+
+    hee_frame = HeliocentricEarthEcliptic(obstime=obstime)
+    jd0 = obstime.utc.jd
+
+    # Bracket the end of each first orbit with a few coarse samples instead of transforming the whole span:
+    coarse_days = np.arange(0, orbit_days, coarse_step)
+    spans = []
+    for x, y in batch_to_hee(ephemeris, [(planet, jd0 + coarse_days) for planet in planets], hee_frame):
+        end = first_orbit_length(x, y)
+        spans.append(orbit_days if end >= len(coarse_days) - 1 else coarse_days[end + 1] + 1)
+
+    # Daily orbit samples up to that bracket and the spacecraft at obstime, in one transform:
+    requests = [(planet, jd0 + np.arange(span)) for planet, span in zip(planets, spans)]
+    requests += [(body, np.array([jd0])) for label, body in spacecraft]
+    positions = batch_to_hee(ephemeris, requests, hee_frame)
+
+    background = {'orbits': {}, 'planets': {}, 'spacecraft': {}}
+
+    for planet, (x, y) in zip(planets, positions):
+        end = first_orbit_length(x, y)
+        background['orbits'][planet] = (y[:end], x[:end])
+        background['planets'][planet] = (y[0], x[0])
+
+    for (label, body), (x, y) in zip(spacecraft, positions[len(planets):]):
+        background['spacecraft'][label] = (y[0], x[0])
+
+    _background_cache[key] = background
+    return background
+
+# Observer positions (X HEE, Y HEE), as used by spiral_engine.observer_distances() and SpiralIndex:
+def hee_observers(background):
+    observers = {planet: (x, y)[::-1] for planet, (x, y) in background['planets'].items()}
+    observers.update({body: background['spacecraft'][label][::-1] for label, body in spacecraft
+                      if label in background['spacecraft']})
+    return observers
@@ -0,0 +1,117 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Parallel parameter sweep over solar wind speeds, r_min, r_max, n_points and angle2Earth.
+#
+# Every parameter tuple is run on a process pool and the results are gathered into one consolidated set:
+#   params                 (runs, 6) parameter tuples, columns in param_names order
+#   offsets                (runs + 1,) start of each run along the concatenated points axis
+#   distances_<stream>     (frames, total points) float32 distance to Earth of every point of every run
+#   min_distance_<stream>  (runs, frames) closest approach of each spiral to Earth per frame
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from spiral_model import SpiralModel, default_params
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+param_names = ('v_sw_slow', 'v_sw_fast', 'r_min', 'r_max', 'n_points', 'angle2Earth')
+
+streams = ('slow', 'fast')
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Cartesian product of the given values (parameters not given keep their default value):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def parameter_grid(**values):
+    axes = [np.atleast_1d(values.get(name, default_params[name])).tolist() for name in param_names]
+    return list(itertools.product(*axes))
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# One run of the model (executed in the worker processes, where the geometry of repeated speeds is memoized):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def run_model(params, n_frames=360):
+    return SpiralModel(*params, n_frames=n_frames).distances
+
+def _run_model(args):
+    return run_model(*args)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Consolidated sweep results, indexed by parameter tuple:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class SweepResult:
+
+    def __init__(self, params, offsets, distances, min_distance):
+        self.params = np.asarray(params, dtype=float)
+        self.offsets = np.asarray(offsets)
+        self.distances = distances
+        self.min_distance = min_distance
+        self.index = {tuple(row): i for i, row in enumerate(self.params.tolist())}
+
+    def __len__(self):
+        return len(self.params)
+
+    # Distance blocks (frames, points) of every stream for one parameter tuple:
+    def __getitem__(self, params):
+        i = self.index[tuple(float(value) for value in params)]
+        points = slice(self.offsets[i], self.offsets[i + 1])
+        return {stream: self.distances[stream][:, points] for stream in streams}
+
+    def save(self, path):
+        arrays = {'params': self.params, 'offsets': self.offsets}
+        for stream in streams:
+            arrays[f'distances_{stream}'] = self.distances[stream]
+            arrays[f'min_distance_{stream}'] = self.min_distance[stream]
+        np.savez(path, **arrays)
+
+def load_sweep(path):
+    data = np.load(path)
+    return SweepResult(data['params'], data['offsets'],
+                       {stream: data[f'distances_{stream}'] for stream in streams},
+                       {stream: data[f'min_distance_{stream}'] for stream in streams})
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Fan the grid out over a process pool (all cores by default) and gather the results:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def run_sweep(grid, n_frames=360, processes=None, output=None):
+    grid = [tuple(params) for params in grid]
+    processes = processes or os.cpu_count()
+    chunksize = max(1, len(grid) // (4 * processes))
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        runs = list(pool.map(_run_model, ((params, n_frames) for params in grid), chunksize=chunksize))
+
+    offsets = np.concatenate(([0], np.cumsum([int(params[4]) for params in grid])))
+    distances = {stream: np.concatenate([run[stream] for run in runs], axis=1).astype(np.float32) for stream in streams}
+    min_distance = {stream: np.array([run[stream].min(axis=1) for run in runs]) for stream in streams}
+
+    result = SweepResult(grid, offsets, distances, min_distance)
+    if output is not None:
+        result.save(output)
+    return result
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Command line, e.g.:  python parameter_sweep.py --v_sw_slow 250 300 350 --angle2Earth -60 -46 -30 --output sweep.npz
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the SIR spiral model over a parameter grid.')
+    for name in param_names:
+        parser.add_argument(f'--{name}', nargs='+', type=int if name == 'n_points' else float, default=[default_params[name]])
+    parser.add_argument('--frames', type=int, default=360)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', default='sweep.npz')
+    args = parser.parse_args()
+
+    grid = parameter_grid(**{name: getattr(args, name) for name in param_names})
+    result = run_sweep(grid, n_frames=args.frames, processes=args.processes, output=args.output)
+    print(f"{len(result)} runs saved to {args.output}")
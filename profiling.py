@@ -0,0 +1,124 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Per-stage instrumentation (standard library only): wall time, number of calls and peak traced memory of every named stage of a
+# run, written as a JSON report at the end.
+#
+#   from profiling import profiler, stage
+#
+#   with stage('frames'):
+#       ...
+#
+#   profiler.enable()                        # e.g. from --profile on the command line
+#   ...
+#   profiler.write('report.json')
+#
+# Stages cost nothing but a function call while the profiler is disabled (the default). Stages may nest; the peak memory of a stage
+# is the highest traced allocation (tracemalloc, which includes NumPy arrays) above what was allocated when it started.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class StageProfiler:
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.stages = {}
+        self._stack = []
+        self._started = None
+
+    def enable(self, memory=True):
+        self.enabled = True
+        self.memory = memory
+        self._started = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        self.enabled = False
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset(self):
+        self.stages = {}
+        self._stack = []
+        self._started = time.perf_counter() if self.enabled else None
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        # Entry: [name, start time, traced bytes at start, highest peak seen so far]:
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][3] = max(self._stack[-1][3], peak)              # Keep the parent's peak before resetting it
+            tracemalloc.reset_peak()
+        else:
+            current = 0
+        entry = [name, time.perf_counter(), current, current]
+        self._stack.append(entry)
+
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - entry[1]
+            self._stack.pop()
+
+            peak_bytes = 0
+            if self.memory:
+                peak = max(tracemalloc.get_traced_memory()[1], entry[3])
+                peak_bytes = peak - entry[2]
+                if self._stack:
+                    self._stack[-1][3] = max(self._stack[-1][3], peak)
+
+            stats = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'peak_bytes': 0})
+            stats['calls'] += 1
+            stats['wall_s'] += wall
+            stats['peak_bytes'] = max(stats['peak_bytes'], peak_bytes)
+
+    # Decorator version of stage():
+    def wrap(self, name):
+        def decorator(function):
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            wrapper.__name__, wrapper.__doc__ = function.__name__, function.__doc__
+            return wrapper
+        return decorator
+
+    def report(self):
+        return {'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'argv': sys.argv,
+                'python': platform.python_version(),
+                'total_wall_s': time.perf_counter() - self._started if self._started is not None else 0.0,
+                'memory_traced': self.memory,
+                'stages': {name: dict(stats, peak_mb=stats['peak_bytes'] / 1024 ** 2) for name, stats in self.stages.items()}}
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+        return path
+
+    # One line per stage, slowest first:
+    def summary(self):
+        lines = []
+        for name, stats in sorted(self.stages.items(), key=lambda item: -item[1]['wall_s']):
+            lines.append(f"{name:<24} {stats['wall_s']:10.3f} s {stats['calls']:8d} calls {stats['peak_bytes'] / 1024 ** 2:10.1f} MB peak")
+        return '\n'.join(lines)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+profiler = StageProfiler()
+stage = profiler.stage
@@ -0,0 +1,139 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Content-addressed cache of whole simulation runs.
+#
+# A run is keyed by the sha256 of its obstime, its model parameters and the code version (a hash of the sources that produce the
+# output), so changing any of them gives a new key. Each entry is a directory holding the .sirs file and, when it was requested,
+# the text log and its frame index:
+#
+#   run_cache/<key>/run.sirs, log.txt, log.txt.idx
+#
+# A hit touches the entry, and once the cache grows past max_bytes the least recently used entries are deleted.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+
+from spiral_log import index_path
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+source_modules = ('spiral_engine', 'spiral_model', 'spiral_io')                 # Modules whose code determines a run's output
+
+run_name = 'run.sirs'
+log_name = 'log.txt'
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Keys:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def code_version(modules=source_modules):
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(importlib.util.find_spec(module).origin, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+def run_key(obstime, params, version=None):
+    description = {'obstime': str(np.datetime64(obstime, 'ms')),
+                   'params': {key: float(value) for key, value in sorted(params.items())},
+                   'code': version or code_version()}
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# The cache:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class ResultCache:
+
+    def __init__(self, cache_dir='run_cache', max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    # Cached entry directory for key (None on a miss, or when a text log is needed and the entry has none):
+    def get(self, key, text_log=False):
+        entry = self._entry(key)
+        if not os.path.exists(os.path.join(entry, run_name)):
+            return None
+        if text_log and not os.path.exists(os.path.join(entry, log_name)):
+            return None
+        os.utime(entry)
+        return entry
+
+    # Copy a finished run (and its text log) into the cache. Runs larger than the whole cache are not cached (returns None):
+    def put(self, key, run_path, text_log=None):
+        files = [run_path] + ([text_log, index_path(text_log)] if text_log else [])
+        if sum(os.path.getsize(path) for path in files if os.path.exists(path)) > self.max_bytes:
+            return None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Fill a temporary directory first, so a reader never sees a half-written entry:
+        staging = tempfile.mkdtemp(dir=self.cache_dir, prefix='.staging_')
+        shutil.copyfile(run_path, os.path.join(staging, run_name))
+        if text_log:
+            shutil.copyfile(text_log, os.path.join(staging, log_name))
+            if os.path.exists(index_path(text_log)):
+                shutil.copyfile(index_path(text_log), index_path(os.path.join(staging, log_name)))
+
+        entry = self._entry(key)
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
+        os.replace(staging, entry)
+
+        self.evict(keep=key)
+        return entry
+
+    # Copy a cached entry out to the requested paths; returns False on a miss:
+    def restore(self, key, run_path, text_log=None):
+        entry = self.get(key, text_log=bool(text_log))
+        if entry is None:
+            return False
+
+        shutil.copyfile(os.path.join(entry, run_name), run_path)
+        if text_log:
+            shutil.copyfile(os.path.join(entry, log_name), text_log)
+            if os.path.exists(index_path(os.path.join(entry, log_name))):
+                shutil.copyfile(index_path(os.path.join(entry, log_name)), index_path(text_log))
+        return True
+
+    # (key, bytes, last use) of every entry, least recently used first:
+    def entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry = self._entry(key)
+            if key.startswith('.') or not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+            entries.append((key, size, os.path.getmtime(entry)))
+        return sorted(entries, key=lambda item: item[2])
+
+    def size(self):
+        return sum(size for key, size, used in self.entries())
+
+    # Delete the least recently used entries until the cache fits in max_bytes (the entry keep is never deleted):
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for key, size, used in entries)
+        for key, size, used in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry(key))
+            total -= size
+        return total
@@ -0,0 +1,229 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Non-interactive command line for the SIR spiral model.
+#
+#   python sirs_cli.py --obstime "2008-01-23 16:39:00" --v_sw_slow 294 --angle2Earth -46
+#   python sirs_cli.py --config run.json --text-log spiral_data.txt --animate
+#   python sirs_cli.py --obstime "2008-01-23 16:39:00" --stream slow 294 --stream ch1 520 -30 --stream ch2 610 75
+#
+# The config file is JSON with any of the option names below (command-line options win over the file); its "streams" entry maps a
+# stream name to a speed or to [speed, angle2Earth], and replaces the slow and fast streams like --stream does. Only numpy is imported
+# for a headless run; astropy, sunpy and matplotlib are imported lazily when --animate needs them.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import argparse
+import json
+from datetime import datetime
+
+import numpy as np
+
+from spiral_engine import count_frames, time_offset
+from spiral_io import open_spiral_binary, stream_label, write_spiral_chunks
+from spiral_model import SpiralModel
+from profiling import profiler, stage
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+defaults = {'obstime': None,
+            'v_sw_slow': 294,
+            'v_sw_fast': 694,
+            'r_min': 0.3,
+            'r_max': 2.5,
+            'n_points': 50,
+            'angle2Earth': -46,
+            'streams': None,
+            'frames': 360,
+            'span_days': None,
+            'cadence': None,
+            'chunk_frames': 4096,
+            'time_offset': time_offset,
+            'output': 'spiral_data.sirs',
+            'text_log': None,
+            'text_stream': None,
+            'animate': False,
+            'export': None,
+            'video': None,
+            'fps': 10,
+            'processes': None,
+            'events': False,
+            'offline': False,
+            'ephemeris_cache': 'ephemeris_cache',
+            'horizons_url': None,
+            'run_cache': 'run_cache',
+            'run_cache_mb': 2048,
+            'profile': None,
+            'profile_memory': True}
+
+obstime_formats = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%b-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d']
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Parse the observation time without astropy (accepts e.g. 2008-01-23 16:39:00 or 2008-JAN-23 16:39:00):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def parse_obstime(text):
+    for time_format in obstime_formats:
+        try:
+            return np.datetime64(datetime.strptime(text.strip().title(), time_format), 'ms')
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised observation time: {text!r}")
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Compute the SIR spirals for one observation time.')
+    parser.add_argument('--config', help='JSON file with any of the options below')
+    parser.add_argument('--obstime', help='observation time, e.g. "2008-01-23 16:39:00"')
+    for name in ('v_sw_slow', 'v_sw_fast', 'r_min', 'r_max', 'angle2Earth', 'time_offset'):
+        parser.add_argument(f'--{name}', type=float)
+    parser.add_argument('--n_points', type=int)
+    parser.add_argument('--stream', dest='streams', action='append', nargs='+', metavar=('NAME', 'SPEED'),
+                        help='stream NAME SPEED [ANGLE2EARTH]; repeat for every stream (replaces the slow and fast streams)')
+    parser.add_argument('--frames', type=int)
+    parser.add_argument('--span-days', dest='span_days', type=float, help='simulated span in days (overrides --frames)')
+    parser.add_argument('--cadence', type=float, help='hours between output frames (default: time_offset)')
+    parser.add_argument('--chunk-frames', dest='chunk_frames', type=int, help='frames computed and written at a time')
+    parser.add_argument('--output', help='binary .sirs output file')
+    parser.add_argument('--text-log', dest='text_log', help='also export the legacy text log to this file')
+    parser.add_argument('--text-stream', dest='text_stream', help='stream written to the text log (default: fast, or the last stream)')
+    parser.add_argument('--events', action='store_true', default=None, help='print the Earth crossings of each stream')
+    parser.add_argument('--animate', action='store_true', default=None, help='show the animation (loads sunpy and matplotlib)')
+    parser.add_argument('--export', help='render the frames headlessly into this directory (numbered PNG files)')
+    parser.add_argument('--video', help='stitch the exported frames into this video file (needs ffmpeg)')
+    parser.add_argument('--fps', type=int)
+    parser.add_argument('--processes', type=int, help='worker processes used by --export (default: all cores)')
+    parser.add_argument('--offline', action='store_true', default=None, help='never fetch ephemerides from the network')
+    parser.add_argument('--ephemeris-cache', dest='ephemeris_cache')
+    parser.add_argument('--horizons-url', dest='horizons_url', help='fetch ephemerides from this Horizons API endpoint')
+    parser.add_argument('--run-cache', dest='run_cache', help='directory of cached runs ("" disables the cache)')
+    parser.add_argument('--run-cache-mb', dest='run_cache_mb', type=float, help='size limit of the run cache in MB')
+    parser.add_argument('--profile', help='record the time, calls and peak memory of every stage into this JSON report')
+    parser.add_argument('--profile-no-memory', dest='profile_memory', action='store_false', default=None,
+                        help='time the stages without tracing memory (tracemalloc slows down allocation-heavy stages)')
+    return parser
+
+# Defaults, then the config file, then the command line:
+def load_config(args):
+    config = dict(defaults)
+    if args.config:
+        with open(args.config) as file:
+            config.update(json.load(file))
+    config.update({key: value for key, value in vars(args).items() if value is not None and key != 'config'})
+    if config['obstime'] is None:
+        raise SystemExit('An observation time is required (--obstime or "obstime" in the config file)')
+    if config['video'] and not config['export']:
+        raise SystemExit('--video stitches the exported frames, so it needs --export DIRECTORY as well')
+    if isinstance(config['streams'], list):
+        config['streams'] = parse_streams(config['streams'])
+    names = list(config['streams'] or ('slow', 'fast'))
+    if config['text_stream'] is not None and config['text_stream'] not in names:
+        raise SystemExit(f"--text-stream must be one of {', '.join(names)}, got {config['text_stream']!r}")
+    return config
+
+# [[name, speed], [name, speed, angle2Earth], ...] from --stream to the {name: speed or (speed, angle2Earth)} of SpiralModel:
+def parse_streams(values):
+    streams = {}
+    for value in values:
+        if len(value) not in (2, 3):
+            raise SystemExit(f"--stream needs NAME SPEED [ANGLE2EARTH], got {' '.join(map(str, value))!r}")
+        name, *numbers = value
+        streams[name] = tuple(float(number) for number in numbers) if len(numbers) == 2 else float(numbers[0])
+    return streams
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Stages:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def build_model(config):
+    cadence = config['cadence'] or config['time_offset']
+    if config['span_days']:
+        n_frames = count_frames(config['span_days'] * 24, cadence)
+    else:
+        n_frames = config['frames']
+    return SpiralModel.from_config(config, n_frames=n_frames, cadence=cadence, obstime=parse_obstime(config['obstime']))
+
+# Compute the frames chunk by chunk and write them straight to the .sirs file (and the text log), unless the same run is cached:
+def simulate(config):
+    from result_cache import ResultCache, code_version, run_key, source_modules
+
+    model = build_model(config)
+    cache = ResultCache(config['run_cache'], config['run_cache_mb'] * 1024 ** 2) if config['run_cache'] else None
+    text_stream = config['text_stream'] or ('fast' if 'fast' in model.names else model.names[-1])
+    key = run_key(model.obstime, dict(model.params, n_frames=model.n_frames, text_stream=model.names.index(text_stream)),
+                  code_version(source_modules + ('sirs_cli',)))
+
+    if cache is not None and cache.restore(key, config['output'], config['text_log']):
+        print(f"Run {key[:12]} restored from {config['run_cache']}")
+        return open_spiral_binary(config['output'])
+
+    run = write_spiral_chunks(config['output'], model.obstime, model.n_frames, model.n_points, model.t0,
+                              model.chunks(config['chunk_frames']), model.params, text_log=config['text_log'], text_stream=text_stream,
+                              text_label=stream_label(text_stream))
+    if cache is not None:
+        cache.put(key, config['output'], config['text_log'])
+    return run
+
+def events(config, run):
+    from spiral_events import find_crossings
+
+    model = build_model(config)
+    for name, v_sw, longitude in zip(model.names, model.v_sw, model.longitudes):
+        table = find_crossings(v_sw, model.r_min, model.r_max, longitude, t_stop=run.hours[-1], obstime=run.obstime,
+                               time_offset=config['time_offset'], n_points=model.n_points)
+        for event in table:
+            print(f"{stream_label(name)} - Earth crossing: {event['time']}, Miss distance [AU]: {event['miss_distance']:.6f}")
+
+def background(config, run):
+    from sunpy.time import parse_time
+
+    from ephemeris_cache import EphemerisCache, HorizonsFetcher
+    from hee_coords import hee_background
+
+    fetcher = HorizonsFetcher(config['horizons_url']) if config['horizons_url'] else None
+    ephemeris = EphemerisCache(config['ephemeris_cache'], fetcher, offline=config['offline'])
+    return hee_background(parse_time(str(run.obstime)), ephemeris)
+
+def export(config, run):
+    from spiral_render import export_movie
+
+    result = export_movie(config['output'], config['export'], background(config, run), video=config['video'], fps=config['fps'],
+                          processes=config['processes'])
+    if result:
+        print(f"Frames exported to {result}")
+
+# Live animation: each frame is recomputed in place from the t0 spirals instead of being read back from the output file:
+def show(config, run):
+    from spiral_plot import animate, setup_figure
+    import matplotlib.pyplot as plt
+
+    fig, ax = setup_figure(background(config, run))
+    ani = animate(fig, ax, run.times, build_model(config).kernels())
+    plt.show()
+    return ani
+
+def main(argv=None):
+    config = load_config(build_parser().parse_args(argv))
+    if config['profile']:
+        profiler.enable(memory=config['profile_memory'])
+
+    try:
+        with stage('simulate'):
+            run = simulate(config)
+        print(f"{run.n_frames} frames x {run.n_points} points saved to {config['output']}")
+        if config['events']:
+            with stage('events'):
+                events(config, run)
+        if config['export']:
+            with stage('export'):
+                export(config, run)
+        if config['animate']:
+            show(config, run)
+    finally:
+        # The report is written even when a stage fails:
+        if config['profile']:
+            print(profiler.summary())
+            print(f"Profile saved to {profiler.write(config['profile'])}")
+
+if __name__ == '__main__':
+    main()
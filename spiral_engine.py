@@ -0,0 +1,210 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Headless spiral engine: rotates the t0 spirals for every frame at once (no matplotlib needed).
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import numpy as np
+
+from profiling import profiler
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+T_sun = 25.38 * 24 * 3600                                                        # Solar rotation period in seconds
+omega_sun = 2 * np.pi / T_sun                                                    # Solar angular speed in rad/s
+AU_km = 1.496e8                                                                  # Astronomical unit in km
+
+time_offset = 1.927                                                              # Hours between consecutive frames
+earth_xy = (1, 0)                                                                # Earth position in the rotated (X, Y) HEE plane [AU]
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Radii of the spiral points and their Parker angle for a solar wind speed [km/s].
+#
+# Streams are stacked along the leading axes: v_sw (and angle2Earth) of shape (streams, 1) give (streams, points) arrays, so any
+# number of streams is computed in one operation:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def spiral_phi(v_sw, r_min, r_max, n_points):
+    r0 = np.linspace(r_min, r_max, n_points)
+    phi = omega_sun * (r0 - r_min) / (v_sw / AU_km)
+    return r0, phi
+
+# Initial (t0) positions of a spiral, rotated so it starts angle2Earth degrees from Earth:
+def spiral_t0(v_sw, r_min, r_max, n_points, angle2Earth):
+    r0, phi = spiral_phi(v_sw, r_min, r_max, n_points)
+
+    x_array_t0 = r0 * np.cos(phi)
+    y_array_t0 = r0 * np.sin(phi)
+
+    theta_angle = (angle2Earth + 90) * (np.pi / 180)
+
+    x_array_t0_new = y_array_t0 * np.cos(theta_angle) - x_array_t0 * np.sin(theta_angle)
+    y_array_t0_new = y_array_t0 * np.sin(theta_angle) + x_array_t0 * np.cos(theta_angle)
+
+    return x_array_t0_new, y_array_t0_new
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Rotate a spiral for all the rotation angles in a single broadcast. t0 positions of shape (points,) give (frames, points) arrays;
+# stacked streams (streams, points) give (streams, frames, points):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+@profiler.wrap('frames')
+def rotate_frames(x_t0_new, y_t0_new, theta_values, observer=earth_xy):
+    x_t0_new = np.asarray(x_t0_new, dtype=float)[..., np.newaxis, :]
+    y_t0_new = np.asarray(y_t0_new, dtype=float)[..., np.newaxis, :]
+
+    # Column vectors of the rotation terms, shape (frames, 1):
+    cos_theta = np.cos(theta_values)[:, np.newaxis]
+    sin_theta = np.sin(theta_values)[:, np.newaxis]
+
+    # Rotate and flip the spiral (same convention as update() in SIRs_v1.py):
+    x_rot = -(x_t0_new * cos_theta - y_t0_new * sin_theta)
+    y_rot = -(x_t0_new * sin_theta + y_t0_new * cos_theta)
+
+    distances = np.hypot(x_rot - observer[0], y_rot - observer[1])
+
+    return x_rot, y_rot, distances
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Hours elapsed since obstime for each frame:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def frame_hours(n_frames, time_offset=time_offset):
+    return np.arange(n_frames) * time_offset
+
+# Rotation angle after some hours (the spirals turn 1 deg every time_offset hours, whatever the output cadence):
+def theta_at(hours, time_offset=time_offset):
+    return np.asarray(hours) * (np.pi / 180) / time_offset
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Long runs in fixed-size chunks of frames, so memory stays flat whatever the span.
+# streams maps a name to its (x_t0_new, y_t0_new); every chunk is (first frame, hours, {name: (x_rot, y_rot, distances)}), all
+# the streams being rotated together:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def count_frames(span_hours, cadence_hours):
+    return int(np.ceil(span_hours / cadence_hours - 1e-9))
+
+def iter_frame_chunks(streams, n_frames, cadence_hours=time_offset, chunk_frames=4096, time_offset=time_offset, observer=earth_xy):
+    names = list(streams)
+    x_t0_new = np.stack([streams[name][0] for name in names])
+    y_t0_new = np.stack([streams[name][1] for name in names])
+
+    for start in range(0, n_frames, chunk_frames):
+        hours = np.arange(start, min(start + chunk_frames, n_frames)) * cadence_hours
+        x_rot, y_rot, distances = rotate_frames(x_t0_new, y_t0_new, theta_at(hours, time_offset), observer)
+        yield start, hours, {name: (x_rot[i], y_rot[i], distances[i]) for i, name in enumerate(names)}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Distances from every spiral point to a set of observers (X, Y HEE, shape (observers, 2)) in one broadcast.
+# x_rot, y_rot are the (frames, points) blocks of rotate_frames(); the result has shape (observers, frames, points), or
+# (observers, streams, frames, points) for stacked streams:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def observer_distances(x_rot, y_rot, observers):
+    observers = np.asarray(observers, dtype=float).reshape(-1, 2)
+    x_obs = observers[:, 0].reshape((-1,) + (1,) * np.ndim(x_rot))
+    y_obs = observers[:, 1].reshape((-1,) + (1,) * np.ndim(y_rot))
+    return np.hypot(x_rot[np.newaxis] - x_obs, y_rot[np.newaxis] - y_obs)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Nearest spiral point to an observer at any rotation angle.
+#
+# The spiral only rotates rigidly, so a single KD-tree built on the t0 points serves every frame: the observer is taken back to
+# the t0 frame (flip, then rotate by -theta) instead of rotating the whole spiral.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class SpiralIndex:
+
+    def __init__(self, x_t0_new, y_t0_new):
+        from scipy.spatial import cKDTree
+        self.tree = cKDTree(np.column_stack((x_t0_new, y_t0_new)))
+
+    # observers (observers, 2) and theta (frames,) give distance and point index arrays of shape (frames, observers):
+    def nearest(self, observers, theta):
+        observers = np.asarray(observers, dtype=float).reshape(-1, 2)
+        cos_theta = np.cos(np.atleast_1d(theta))[:, np.newaxis]
+        sin_theta = np.sin(np.atleast_1d(theta))[:, np.newaxis]
+
+        x_obs, y_obs = -observers[:, 0], -observers[:, 1]
+        x_t0 = x_obs * cos_theta + y_obs * sin_theta
+        y_t0 = -x_obs * sin_theta + y_obs * cos_theta
+
+        distance, index = self.tree.query(np.stack((x_t0, y_t0), axis=-1))
+        return distance, index
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Allocation-free frame kernel for live animation.
+#
+# The rotation terms of every frame are computed once, and each compute(frame) writes the rotated spiral in place into
+# preallocated buffers. offsets is the (points, 2) array of plotted (Y HEE, X HEE) coordinates; x and y are views of its columns.
+# Stacked streams (streams, points) are computed together, into (streams, points, 2) offsets; stream(i) is the kernel of one of
+# them for the animation.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class FrameKernel:
+
+    def __init__(self, x_t0_new, y_t0_new, theta_values, observer=earth_xy):
+        self.x_t0 = np.ascontiguousarray(x_t0_new, dtype=float)
+        self.y_t0 = np.ascontiguousarray(y_t0_new, dtype=float)
+        self.cos_theta = np.cos(theta_values)
+        self.sin_theta = np.sin(theta_values)
+        self.observer = observer
+
+        shape = self.x_t0.shape
+        self.offsets = np.empty(shape + (2,))
+        self.x = self.offsets[..., 1]
+        self.y = self.offsets[..., 0]
+        self.distance = np.empty(shape)
+        self._work = np.empty(shape)
+        self._frame = None
+
+    def __len__(self):
+        return len(self.cos_theta)
+
+    def stream(self, i):
+        return StreamKernel(self, i)
+
+    def compute(self, frame):
+        if frame == self._frame:                                                 # Already in the buffers (shared by the streams)
+            return self.offsets
+        self._frame = frame
+
+        cos_theta, sin_theta = self.cos_theta[frame], self.sin_theta[frame]
+        work = self._work
+
+        # x_rot = -(x_t0 cos - y_t0 sin)
+        np.multiply(self.y_t0, sin_theta, out=work)
+        np.multiply(self.x_t0, cos_theta, out=self.x)
+        np.subtract(work, self.x, out=self.x)
+
+        # y_rot = -(x_t0 sin + y_t0 cos)
+        np.multiply(self.x_t0, sin_theta, out=self.y)
+        np.multiply(self.y_t0, cos_theta, out=work)
+        np.add(self.y, work, out=self.y)
+        np.negative(self.y, out=self.y)
+
+        # Distance to the observer (np.hypot is several times slower than the squares here):
+        np.subtract(self.x, self.observer[0], out=work)
+        np.multiply(work, work, out=work)
+        np.subtract(self.y, self.observer[1], out=self.distance)
+        np.multiply(self.distance, self.distance, out=self.distance)
+        np.add(self.distance, work, out=self.distance)
+        np.sqrt(self.distance, out=self.distance)
+
+        return self.offsets
+
+# One stream of a stacked FrameKernel (views of its buffers):
+class StreamKernel:
+
+    def __init__(self, kernel, i):
+        self.kernel = kernel
+        self.offsets = kernel.offsets[i]
+        self.x, self.y, self.distance = kernel.x[i], kernel.y[i], kernel.distance[i]
+
+    def __len__(self):
+        return len(self.kernel)
+
+    def compute(self, frame):
+        self.kernel.compute(frame)
+        return self.offsets
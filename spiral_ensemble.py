@@ -0,0 +1,176 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Monte Carlo ensemble of spirals: the slow wind speed, the slow-fast speed difference and angle2Earth are drawn from normal
+# distributions, and the members are run in vectorized batches through spiral_engine (t0 positions and rotation broadcast over
+# members x frames x points).
+#
+# Every batch is folded into streaming statistics and then dropped, so memory depends on the batch size and not on the number of
+# members:
+#   mean, std        Welford / Chan running moments per (frame, point)
+#   quantile(q)      from a fixed-bin distance histogram per (frame, point)
+# The same statistics are kept for the closest approach of each spiral per frame (min_distance).
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import argparse
+
+import numpy as np
+
+from spiral_engine import rotate_frames, spiral_t0, time_offset
+from spiral_model import default_params, frame_angles
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+streams = ('slow', 'fast')
+
+# (mean, standard deviation) of the drawn parameters:
+default_spread = {'v_sw_slow': (294, 30),
+                  'fast_offset': (400, 50),                                      # v_sw_fast = v_sw_slow + fast_offset
+                  'angle2Earth': (-46, 5)}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Draw the parameters of n_members members. Returns a dict of (n_members,) arrays: v_sw_slow, v_sw_fast, angle2Earth:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def draw_members(n_members, rng, spread=default_spread, min_speed=100):
+    v_sw_slow = np.maximum(rng.normal(*spread['v_sw_slow'], n_members), min_speed)
+    v_sw_fast = np.maximum(v_sw_slow + rng.normal(*spread['fast_offset'], n_members), min_speed)
+    angle2Earth = rng.normal(*spread['angle2Earth'], n_members)
+    return {'v_sw_slow': v_sw_slow, 'v_sw_fast': v_sw_fast, 'angle2Earth': angle2Earth}
+
+# (x_rot, y_rot, distances) of a batch of members, shape (members, frames, points), for each stream. All the streams of all the
+# members are computed in one broadcast, stacked as (streams, members, points):
+def member_frames(members, r_min, r_max, n_points, theta_values):
+    v_sw = np.stack([members[f'v_sw_{stream}'] for stream in streams])[..., np.newaxis]
+    angle2Earth = members['angle2Earth'][:, np.newaxis]
+
+    x_t0_new, y_t0_new = spiral_t0(v_sw, r_min, r_max, n_points, angle2Earth)
+    x_rot, y_rot, distances = rotate_frames(x_t0_new, y_t0_new, theta_values)
+    return {stream: (x_rot[i], y_rot[i], distances[i]) for i, stream in enumerate(streams)}
+
+def member_distances(members, r_min, r_max, n_points, theta_values):
+    return {stream: frames[2] for stream, frames in member_frames(members, r_min, r_max, n_points, theta_values).items()}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Streaming statistics of a (frames, points) field over members. Distances beyond d_max fall in the last histogram bin.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class StreamingStats:
+
+    def __init__(self, shape, bins=256, d_max=4.0):
+        self.shape = tuple(shape)
+        self.bins = bins
+        self.d_max = d_max
+        self.count = 0
+        self._mean = np.zeros(self.shape)
+        self._m2 = np.zeros(self.shape)
+        self.histogram = np.zeros(self.shape + (bins,), dtype=np.int64)
+
+    # Fold in a batch of shape (members,) + shape:
+    def update(self, values):
+        n_batch = len(values)
+        if n_batch == 0:
+            return
+
+        # Chan's parallel update of the running mean and sum of squared deviations:
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n_batch
+        delta = batch_mean - self._mean
+        self._mean += delta * (n_batch / total)
+        self._m2 += batch_m2 + delta ** 2 * (self.count * n_batch / total)
+        self.count = total
+
+        # One bincount over (cell, bin) for the whole batch:
+        bin_index = np.clip((values * (self.bins / self.d_max)).astype(np.int64), 0, self.bins - 1)
+        cells = np.arange(np.prod(self.shape, dtype=np.int64)).reshape(self.shape) * self.bins
+        self.histogram += np.bincount((cells + bin_index).ravel(), minlength=self.histogram.size).reshape(self.histogram.shape)
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @property
+    def std(self):
+        return np.sqrt(self._m2 / max(self.count - 1, 1))
+
+    # Quantiles q in [0, 1], shape (len(q),) + shape, interpolated linearly inside the histogram bins:
+    def quantile(self, q):
+        q = np.atleast_1d(q)
+        cumulative = np.cumsum(self.histogram, axis=-1)
+        width = self.d_max / self.bins
+
+        result = np.empty(q.shape + self.shape)
+        for i, value in enumerate(q):
+            target = value * self.count
+            upper = np.minimum((cumulative < target).sum(axis=-1), self.bins - 1)
+            below = np.where(upper > 0, np.take_along_axis(cumulative, np.maximum(upper - 1, 0)[..., np.newaxis], -1)[..., 0], 0)
+            inside = np.take_along_axis(self.histogram, upper[..., np.newaxis], -1)[..., 0]
+            fraction = np.clip((target - below) / np.maximum(inside, 1), 0, 1)
+            result[i] = (upper + fraction) * width
+        return result
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# The ensemble:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class EnsembleResult:
+
+    def __init__(self, distances, min_distance, hours, spread):
+        self.distances = distances                                               # {stream: StreamingStats (frames, points)}
+        self.min_distance = min_distance                                         # {stream: StreamingStats (frames,)}
+        self.hours = hours
+        self.spread = spread
+
+    @property
+    def n_members(self):
+        return self.distances[streams[0]].count
+
+    def save(self, path, quantiles=(0.05, 0.5, 0.95)):
+        arrays = {'hours': self.hours, 'quantiles': np.asarray(quantiles), 'n_members': self.n_members}
+        for name, stats in (('distances', self.distances), ('min_distance', self.min_distance)):
+            for stream in streams:
+                arrays[f'{name}_{stream}_mean'] = stats[stream].mean
+                arrays[f'{name}_{stream}_std'] = stats[stream].std
+                arrays[f'{name}_{stream}_quantiles'] = stats[stream].quantile(quantiles)
+        np.savez(path, **arrays)
+
+def run_ensemble(n_members, batch_size=256, seed=None, spread=default_spread, r_min=default_params['r_min'],
+                 r_max=default_params['r_max'], n_points=default_params['n_points'], n_frames=360, cadence=time_offset,
+                 time_offset=time_offset, bins=256, output=None):
+    rng = np.random.default_rng(seed)
+    hours, theta_values = frame_angles(n_frames, cadence, time_offset)
+
+    d_max = r_max + 1.0                                                          # Farthest a point can be from Earth
+    distances = {stream: StreamingStats((n_frames, n_points), bins, d_max) for stream in streams}
+    min_distance = {stream: StreamingStats((n_frames,), bins, d_max) for stream in streams}
+
+    for start in range(0, n_members, batch_size):
+        members = draw_members(min(batch_size, n_members - start), rng, spread)
+        for stream, batch in member_distances(members, r_min, r_max, n_points, theta_values).items():
+            distances[stream].update(batch)
+            min_distance[stream].update(batch.min(axis=2))
+
+    result = EnsembleResult(distances, min_distance, hours, spread)
+    if output is not None:
+        result.save(output)
+    return result
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Command line, e.g.:  python spiral_ensemble.py --members 10000 --v_sw_slow 294 30 --angle2Earth -46 5 --output ensemble.npz
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a Monte Carlo ensemble of the SIR spiral model.')
+    for name, (mean, std) in default_spread.items():
+        parser.add_argument(f'--{name}', nargs=2, type=float, default=[mean, std], metavar=('MEAN', 'STD'))
+    parser.add_argument('--members', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=256, help='members computed at a time')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--frames', type=int, default=360)
+    parser.add_argument('--output', default='ensemble.npz')
+    args = parser.parse_args()
+
+    spread = {name: tuple(getattr(args, name)) for name in default_spread}
+    result = run_ensemble(args.members, args.batch, args.seed, spread, n_frames=args.frames, output=args.output)
+    print(f"{result.n_members} members saved to {args.output}")
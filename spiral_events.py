@@ -0,0 +1,100 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Sub-frame detection of the times when a spiral passes an observer (Earth by default).
+#
+# In the rotated (X, Y) HEE plane of spiral_engine, the spiral point at radius r lies at the longitude
+#   psi(r, t) = angle2Earth - phi(r) + theta(t),   theta(t) = t * (1 deg) / time_offset,
+# so the crossing times of the observer's longitude are found with a root finder (a few evaluations per rotation) instead of
+# scanning the 1 deg frames.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import numpy as np
+from scipy.optimize import brentq, minimize_scalar
+
+from spiral_engine import AU_km, earth_xy, omega_sun, time_offset
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+event_dtype = np.dtype([('hours', 'f8'), ('time', 'M8[ms]'), ('radius', 'f8'), ('miss_distance', 'f8')])
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Continuous spiral geometry (r in AU, hours since obstime):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def spiral_longitude(r, hours, v_sw, r_min, angle2Earth, time_offset=time_offset):
+    phi = omega_sun * (np.asarray(r) - r_min) / (v_sw / AU_km)
+    theta = np.asarray(hours) * (np.pi / 180) / time_offset
+    return angle2Earth * (np.pi / 180) - phi + theta
+
+def spiral_xy(r, hours, v_sw, r_min, angle2Earth, time_offset=time_offset):
+    psi = spiral_longitude(r, hours, v_sw, r_min, angle2Earth, time_offset)
+    return r * np.cos(psi), r * np.sin(psi)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Distance from the observer to the spiral at a given time: to the point at radius, to the closest of the n_points model points
+# (np.linspace(r_min, r_max, n_points), as in distances_fast), or to the closest point of the whole continuous spiral:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def miss_distance(hours, v_sw, r_min, r_max, angle2Earth, observer=earth_xy, radius=None, time_offset=time_offset, n_points=None):
+    def distance(r):
+        x, y = spiral_xy(r, hours, v_sw, r_min, angle2Earth, time_offset)
+        return np.hypot(x - observer[0], y - observer[1])
+
+    if radius is not None:
+        return float(distance(radius))
+    if n_points is not None:
+        return float(np.min(distance(np.linspace(r_min, r_max, n_points))))
+
+    # Coarse scan along the spiral (it may wind more than once), then refine around the closest sample:
+    r_samples = np.linspace(r_min, r_max, 65)
+    best = int(np.argmin(distance(r_samples)))
+    bounds = (r_samples[max(best - 1, 0)], r_samples[min(best + 1, len(r_samples) - 1)])
+    result = minimize_scalar(distance, bounds=bounds, method='bounded', options={'xatol': 1e-9})
+    return float(min(result.fun, distance(r_samples[best])))
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Crossings of the observer's longitude between t_start and t_stop (hours since obstime).
+#
+# radius=None follows the spiral at the observer's distance from the Sun (clipped to [r_min, r_max]); pass the radius of one
+# spiral point, e.g. np.linspace(r_min, r_max, n_points)[k], to get the arrivals of that point (Distance_Row_k).
+#
+# The continuous spiral passes through the observer at every crossing, so with radius=None the miss distance is only meaningful
+# when n_points is given: it is then the distance to the closest of the n_points model points. Without either it is 0.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def find_crossings(v_sw, r_min, r_max, angle2Earth, observer=earth_xy, t_start=0, t_stop=360 * time_offset, radius=None,
+                   obstime=None, time_offset=time_offset, n_points=None):
+    observer_lon = np.arctan2(observer[1], observer[0])
+    point_radius = radius
+    if radius is None:
+        radius = float(np.clip(np.hypot(*observer), r_min, r_max))
+
+    # Angle between the spiral at that radius and the observer, wrapped to [-pi, pi):
+    def offset(hours):
+        psi = spiral_longitude(radius, hours, v_sw, r_min, angle2Earth, time_offset)
+        return (psi - observer_lon + np.pi) % (2 * np.pi) - np.pi
+
+    # Four samples per rotation: one sign change from - to + per crossing (the wrap from +pi to -pi is skipped):
+    period = 360 * time_offset
+    grid = np.linspace(t_start, t_stop, max(int(np.ceil(4 * (t_stop - t_start) / period)), 1) + 1)
+    values = offset(grid)
+
+    events = []
+    for i in np.flatnonzero((values[:-1] < 0) & (values[1:] >= 0)):
+        hours = brentq(offset, grid[i], grid[i + 1], xtol=1e-9)
+        events.append(hours)
+
+    table = np.zeros(len(events), dtype=event_dtype)
+    table['radius'] = radius
+    for i, hours in enumerate(events):
+        table[i]['hours'] = hours
+        table[i]['miss_distance'] = miss_distance(hours, v_sw, r_min, r_max, angle2Earth, observer, point_radius, time_offset,
+                                                  n_points)
+
+    if obstime is None:
+        table['time'] = np.datetime64('NaT')
+    else:
+        table['time'] = np.datetime64(obstime, 'ms') + np.round(table['hours'] * 3.6e6).astype('timedelta64[ms]')
+
+    return table
@@ -0,0 +1,149 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Occupancy heatmaps: how often the spirals pass through each cell of the HEE plane, over all the frames of a run, of many runs
+# (epochs) or of an ensemble.
+#
+# Positions are binned block by block with one np.bincount per block into a fixed grid of counts, so the number of samples is
+# only limited by time (the blocks are frame chunks, memory-mapped runs or ensemble batches, never the whole set at once).
+#
+#   python spiral_heatmap.py run_2008.sirs run_2009.sirs --image occupancy.png
+#   python spiral_heatmap.py --ensemble 10000 --output occupancy.npz
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import argparse
+
+import numpy as np
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+plot_extent = (-2.5, 2.5, -2.5, 2.5)                                             # (Y HEE min, max, X HEE min, max) [AU]
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# 2D histogram in plot coordinates: counts[i, j] is the cell at X HEE row i, Y HEE column j (same orientation as spiral_plot):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class OccupancyGrid:
+
+    def __init__(self, bins=500, extent=plot_extent):
+        self.bins = (bins, bins) if np.isscalar(bins) else tuple(bins)          # (X HEE rows, Y HEE columns)
+        self.extent = tuple(extent)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+
+    @property
+    def samples(self):
+        return int(self.counts.sum())
+
+    # Add any number of positions (x_rot, y_rot of spiral_engine, any matching shapes); positions off the grid are dropped:
+    def add(self, x_rot, y_rot):
+        y_min, y_max, x_min, x_max = self.extent
+        rows, columns = self.bins
+
+        row = (np.ravel(x_rot) - x_min) * (rows / (x_max - x_min))
+        column = (np.ravel(y_rot) - y_min) * (columns / (y_max - y_min))
+        inside = (row >= 0) & (row < rows) & (column >= 0) & (column < columns)
+
+        cell = row[inside].astype(np.int64) * columns + column[inside].astype(np.int64)
+        self.counts += np.bincount(cell, minlength=self.counts.size).reshape(self.bins)
+        return self
+
+    def merge(self, other):
+        if other.bins != self.bins or other.extent != self.extent:
+            raise ValueError('Occupancy grids with different bins or extent cannot be merged')
+        self.counts += other.counts
+        return self
+
+    # Fraction of the samples in each cell:
+    def density(self):
+        return self.counts / max(self.samples, 1)
+
+    def save(self, path):
+        np.savez(path, counts=self.counts, extent=np.array(self.extent))
+
+def load_occupancy(path):
+    with np.load(path) as data:
+        grid = OccupancyGrid(data['counts'].shape, tuple(data['extent']))
+        grid.counts[:] = data['counts']
+    return grid
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Sources. Each one fills (or creates) a {stream: OccupancyGrid} dict:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def _grid(grids, stream, bins, extent):
+    if stream not in grids:
+        grids[stream] = OccupancyGrid(bins, extent)
+    return grids[stream]
+
+# Chunks of spiral_engine.iter_frame_chunks() / SpiralModel.chunks():
+def occupancy_from_chunks(chunks, grids=None, bins=500, extent=plot_extent):
+    grids = {} if grids is None else grids
+    for start, hours, frames in chunks:
+        for stream, (x_rot, y_rot, distances) in frames.items():
+            _grid(grids, stream, bins, extent).add(x_rot, y_rot)
+    return grids
+
+# A .sirs run, read from the memory map chunk_frames frames at a time:
+def occupancy_from_run(run, grids=None, bins=500, extent=plot_extent, chunk_frames=4096):
+    grids = {} if grids is None else grids
+    for stream, arrays in run.streams.items():
+        grid = _grid(grids, stream, bins, extent)
+        for start in range(0, run.n_frames, chunk_frames):
+            grid.add(arrays['x'][start:start + chunk_frames], arrays['y'][start:start + chunk_frames])
+    return grids
+
+# Ensemble members drawn as in spiral_ensemble.run_ensemble():
+def occupancy_from_ensemble(n_members, batch_size=256, seed=None, grids=None, bins=500, extent=plot_extent, **ensemble):
+    from spiral_ensemble import default_spread, draw_members, member_frames
+    from spiral_model import default_params, frame_angles
+    from spiral_engine import time_offset
+
+    spread = ensemble.get('spread', default_spread)
+    r_min, r_max = ensemble.get('r_min', default_params['r_min']), ensemble.get('r_max', default_params['r_max'])
+    n_points = ensemble.get('n_points', default_params['n_points'])
+    theta_values = frame_angles(ensemble.get('n_frames', 360), ensemble.get('cadence', time_offset), time_offset)[1]
+
+    grids = {} if grids is None else grids
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_members, batch_size):
+        members = draw_members(min(batch_size, n_members - start), rng, spread)
+        for stream, (x_rot, y_rot, distances) in member_frames(members, r_min, r_max, n_points, theta_values).items():
+            _grid(grids, stream, bins, extent).add(x_rot, y_rot)
+    return grids
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Command line:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Accumulate spiral occupancy heatmaps over the HEE plane.')
+    parser.add_argument('runs', nargs='*', help='.sirs runs (e.g. one per epoch)')
+    parser.add_argument('--ensemble', type=int, default=0, help='also add this many ensemble members')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--bins', type=int, default=500)
+    parser.add_argument('--stream', default='fast', help='stream drawn in the image')
+    parser.add_argument('--output', help='save the counts of every stream to <output>_<stream>.npz')
+    parser.add_argument('--image', help='save the heatmap of --stream to this image')
+    args = parser.parse_args()
+
+    from spiral_io import open_spiral_binary
+
+    grids = {}
+    for path in args.runs:
+        occupancy_from_run(open_spiral_binary(path), grids, args.bins)
+    if args.ensemble:
+        occupancy_from_ensemble(args.ensemble, seed=args.seed, grids=grids, bins=args.bins)
+
+    for stream, grid in grids.items():
+        print(f"{stream}: {grid.samples} samples")
+        if args.output:
+            grid.save(f"{args.output.removesuffix('.npz')}_{stream}.npz")
+
+    if args.image:
+        import matplotlib
+        matplotlib.use('Agg')
+        from spiral_plot import draw_occupancy, setup_figure
+
+        fig, ax = setup_figure()
+        draw_occupancy(ax, grids[args.stream])
+        fig.savefig(args.image, dpi=150)
@@ -0,0 +1,232 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Binary columnar spiral output (.sirs) with a memory-mapped reader, plus the legacy text log as an optional export.
+#
+# File layout:
+#   8 bytes    magic b'SIRSBIN1'
+#   8 bytes    little-endian uint64 with the JSON header length (header padded with spaces to a multiple of 64 bytes)
+#   header     JSON: obstime, n_frames, n_points, streams, params
+#   times      n_frames x datetime64[ms]
+#   streams    for every stream, in header order: x, y, distance, each n_frames x n_points float64 (C order)
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import json
+from datetime import datetime
+
+import numpy as np
+
+from profiling import profiler, stage
+from spiral_log import save_frame_index
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+magic = b'SIRSBIN1'
+time_dtype = np.dtype('<M8[ms]')
+value_dtype = np.dtype('<f8')
+fields = ('x', 'y', 'distance')
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Build the padded header block:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def _header_bytes(header):
+    text = json.dumps(header, sort_keys=True).encode('utf-8')
+    size = 16 + len(text)
+    text += b' ' * (-size % 64)
+    return magic + np.uint64(len(text)).tobytes() + text
+
+# Frame timestamps from hours elapsed since obstime:
+def _to_times(obstime, hours):
+    return np.datetime64(obstime, 'ms') + np.round(np.asarray(hours, dtype=float) * 3.6e6).astype('timedelta64[ms]')
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Memory-mapped view of a .sirs file:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class SpiralRun:
+
+    def __init__(self, path, mode='r'):
+        self.path = path
+
+        with open(path, 'rb') as file:
+            if file.read(8) != magic:
+                raise ValueError(f"{path} is not a SIRs binary file")
+            header_length = int(np.frombuffer(file.read(8), dtype='<u8')[0])
+            self.header = json.loads(file.read(header_length))
+
+        self.n_frames = self.header['n_frames']
+        self.n_points = self.header['n_points']
+        self.params = self.header['params']
+        self.obstime = np.datetime64(self.header['obstime'], 'ms')
+
+        # Byte offset of every column:
+        offset = 16 + header_length
+        self.offsets = {'times': offset}
+        offset += self.n_frames * time_dtype.itemsize
+        for name in self.header['streams']:
+            for field in fields:
+                self.offsets[name, field] = offset
+                offset += self.n_frames * self.n_points * value_dtype.itemsize
+
+        self.times = np.memmap(path, dtype=time_dtype, mode=mode, offset=self.offsets['times'], shape=(self.n_frames,))
+
+        shape = (self.n_frames, self.n_points)
+        self.streams = {}
+        for name in self.header['streams']:
+            self.streams[name] = {field: np.memmap(path, dtype=value_dtype, mode=mode, offset=self.offsets[name, field], shape=shape)
+                                  for field in fields}
+
+    # Hours elapsed since obstime for each frame:
+    @property
+    def hours(self):
+        return (self.times - self.obstime) / np.timedelta64(1, 'h')
+
+    # Frame slice covering [start, stop) (datetime64 or ISO strings, None = open end):
+    def time_slice(self, start=None, stop=None):
+        first = 0 if start is None else int(np.searchsorted(self.times, np.datetime64(start, 'ms'), side='left'))
+        last = self.n_frames if stop is None else int(np.searchsorted(self.times, np.datetime64(stop, 'ms'), side='left'))
+        return slice(first, last)
+
+    # Time series of a single point of one stream:
+    def point(self, stream, index, field='distance', start=None, stop=None):
+        frames = self.time_slice(start, stop)
+        return self.times[frames], self.streams[stream][field][frames, index]
+
+    # (x, y, distance) blocks of one stream restricted to a time range:
+    def window(self, stream, start=None, stop=None):
+        frames = self.time_slice(start, stop)
+        return tuple(self.streams[stream][field][frames] for field in fields)
+
+    def flush(self):
+        self.times.flush()
+        for arrays in self.streams.values():
+            for array in arrays.values():
+                array.flush()
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Create an empty .sirs file of the final size and return it open for writing:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def create_spiral_binary(path, obstime, n_frames, n_points, streams, params=None):
+    header = {'obstime': str(np.datetime64(obstime, 'ms')),
+              'n_frames': int(n_frames),
+              'n_points': int(n_points),
+              'streams': list(streams),
+              'params': params or {}}
+
+    header_block = _header_bytes(header)
+    data_size = n_frames * time_dtype.itemsize + len(header['streams']) * len(fields) * n_frames * n_points * value_dtype.itemsize
+
+    with open(path, 'wb') as file:
+        file.write(header_block)
+        file.truncate(len(header_block) + data_size)
+
+    return SpiralRun(path, mode='r+')
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Write a whole run in bulk. streams maps a name to its (x, y, distance) blocks of shape (frames, points):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+@profiler.wrap('write_binary')
+def write_spiral_binary(path, obstime, hours, streams, params=None):
+    hours = np.asarray(hours, dtype=float)
+    n_points = np.shape(next(iter(streams.values()))[0])[1]
+
+    run = create_spiral_binary(path, obstime, len(hours), n_points, streams.keys(), params)
+    run.times[:] = _to_times(obstime, hours)
+    for name, blocks in streams.items():
+        for field, block in zip(fields, blocks):
+            run.streams[name][field][:] = block
+    run.flush()
+
+    return run
+
+def open_spiral_binary(path):
+    return SpiralRun(path)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Write a run chunk by chunk (e.g. from spiral_engine.iter_frame_chunks) with plain file writes, so only one chunk is ever held in
+# memory. The fast stream can be appended to the legacy text log at the same time:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def write_spiral_chunks(path, obstime, n_frames, n_points, streams, chunks, params=None, text_log=None, text_stream='fast',
+                        text_label=None):
+    run = create_spiral_binary(path, obstime, n_frames, n_points, streams, params)
+    row_bytes = n_points * value_dtype.itemsize
+
+    log = TextLogWriter(text_log, text_label or stream_label(text_stream)) if text_log else None
+
+    # The log is closed (and its .idx saved for the frames written so far) even if a chunk fails:
+    try:
+        with open(path, 'r+b') as file:
+            for start, hours, blocks in chunks:
+                times = _to_times(obstime, hours)
+                with stage('write_binary'):
+                    file.seek(run.offsets['times'] + start * time_dtype.itemsize)
+                    file.write(times.astype(time_dtype).tobytes())
+
+                    for name, block in blocks.items():
+                        for field, values in zip(fields, block):
+                            file.seek(run.offsets[name, field] + start * row_bytes)
+                            file.write(np.ascontiguousarray(values, dtype=value_dtype).tobytes())
+
+                if log:
+                    log.write(start, times, *blocks[text_stream])
+    finally:
+        if log:
+            log.close()
+
+    return SpiralRun(path)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Legacy text log ("Frame N - Date: ...", one line per point). The logged x/y are the plotted axes, i.e. (Y HEE, X HEE):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def format_log_date(time):
+    return np.datetime64(time, 'ms').astype(datetime).strftime('%d-%b-%Y %H:%M UT')
+
+# Label of the point lines of a stream ("Fast Spiral - x: ..."), the same in every writer:
+def stream_label(name):
+    return f"{name.title()} Spiral"
+
+def format_frame(frame, time, x_rot, y_rot, distances, label='Slow Spiral'):
+    lines = [f"Frame {frame} - Date: {format_log_date(time)}:\n"]
+    lines += [f"{label} - x: {x_f:.3f}, y: {y_f:.3f}, Distance to Earth [AU]: {d_f:.3f}\n"
+              for x_f, y_f, d_f in zip(y_rot, x_rot, distances)]
+    lines.append("\n")
+    return ''.join(lines)
+
+# Text log writer that also records the byte offset of every frame and saves the <log>.idx frame index on close:
+class TextLogWriter:
+
+    def __init__(self, path, label='Slow Spiral'):
+        self.path = path
+        self.label = label
+        self.file = open(path, 'w', newline='\n')
+        self.file.write("Spiral Data Log\n\n")
+        self.position = len("Spiral Data Log\n\n")
+        self.frames, self.times, self.offsets = [], [], []
+
+    @profiler.wrap('text_log')
+    def write(self, first_frame, times, x_rot, y_rot, distances):
+        texts = [format_frame(first_frame + i, times[i], x_rot[i], y_rot[i], distances[i], self.label) for i in range(len(times))]
+        for i, text in enumerate(texts):
+            self.frames.append(first_frame + i)
+            self.offsets.append(self.position)
+            self.position += len(text)
+        self.times.extend(times)
+        self.file.write(''.join(texts))
+        self.file.flush()                                                        # Lets spiral_log.LogFollower see each chunk
+
+    def close(self):
+        self.file.close()
+        # Same (minute) resolution as the dates written in the log:
+        save_frame_index(self.path, self.frames, np.array(self.times, dtype='datetime64[m]'), self.offsets)
+
+def export_text_log(path, times, x_rot, y_rot, distances, label='Slow Spiral', first_frame=0):
+    log = TextLogWriter(path, label)
+    try:
+        log.write(first_frame, times, x_rot, y_rot, distances)
+    finally:
+        log.close()
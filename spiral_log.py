@@ -0,0 +1,309 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Single-pass parser for the spiral text logs (spiral_data.txt):
+#
+#   Frame 0 - Date: 23-Jan-2008 16:39 UT:
+#   Fast Spiral - x: -0.216, y: 0.208, Distance to Earth [AU]: 0.820
+#   ...
+#
+# The whole file is read at once and every row of every frame is returned as NumPy arrays, so any set of rows can be taken
+# afterwards without reparsing. Readers that only need the distances (simulated_distances, LogFollower) ask for that field alone,
+# which skips the x/y numbers entirely.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import os
+import re
+import time
+
+import numpy as np
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+frame_regex = re.compile(rb"^Frame (\d+) - Date: (\d{2}-\w{3}-\d{4} \d{2}:\d{2}) UT:", re.M)
+value_regex = re.compile(rb"-?\d+\.\d+")                                          # Only the point lines carry decimals
+label_regex = re.compile(rb"^(.*) - x: ", re.M)                                  # Stream label of the point lines
+
+point_fields = ('x', 'y', 'distance')
+
+# Every byte but the digits, signs, decimal points and whitespace (the ", y:" and ", Distance to Earth [AU]:" fields):
+field_bytes = bytes(byte for byte in range(256) if byte not in b'0123456789.- \t\r\n')
+
+month_map = {b'Jan': '01', b'Feb': '02', b'Mar': '03', b'Apr': '04', b'May': '05', b'Jun': '06',
+             b'Jul': '07', b'Aug': '08', b'Sep': '09', b'Oct': '10', b'Nov': '11', b'Dec': '12'}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Fixed-format date parse ("23-Jan-2008 16:39" -> datetime64[ms]):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def parse_log_dates(dates):
+    iso = [f"{d[7:11].decode()}-{month_map[d[3:6]]}-{d[0:2].decode()}T{d[12:17].decode()}" for d in dates]
+    return np.array(iso, dtype='datetime64[ms]')
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Parse log text (bytes). Returns a dict of arrays:
+#   frame (frames,), time (frames,), and every requested field of x, y, distance (frames, points)
+# Frames with fewer points than the largest one are padded with NaN.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+# Frame headers of the text: found with bytes.find (much faster than scanning the whole text with frame_regex), then parsed:
+def _frame_headers(text):
+    headers = []
+    position = 0 if text.startswith(b'Frame ') else text.find(b'\nFrame ')
+    while position != -1:
+        match = frame_regex.match(text, position + (text[position:position + 1] == b'\n'))
+        if match:
+            headers.append((match.start(), match.end(), match.group(1), match.group(2)))
+        position = text.find(b'\nFrame ', position + 1)
+    return headers
+
+def parse_spiral_text(text, fields=point_fields):
+    fields = tuple(fields)
+    headers = _frame_headers(text)
+
+    starts = [header[1] for header in headers]
+    ends = [header[0] for header in headers[1:]] + [len(text)]
+
+    # Distances alone take the fast path when the log has the writers' layout:
+    parsed = _distance_values(text, starts) if fields == ('distance',) and starts else None
+    if parsed is not None:
+        values, counts = parsed
+    else:
+        counts = np.array([text.count(b'Distance to Earth', start, end) for start, end in zip(starts, ends)], dtype=int)
+        values = _point_values(text, starts, ends)
+        if len(values) != counts.sum():                                          # e.g. several labels in one hand-edited log
+            values = np.array(value_regex.findall(text, starts[0] if starts else 0), dtype=float).reshape(-1, 3)
+        values = values[:, [point_fields.index(field) for field in fields]]
+
+    n_frames, n_points = len(headers), (counts.max() if len(counts) else 0)
+    if np.all(counts == n_points):
+        blocks = values.reshape(n_frames, n_points, len(fields))
+    else:
+        blocks = np.full((n_frames, n_points, len(fields)), np.nan)
+        mask = np.arange(n_points) < counts[:, np.newaxis]
+        blocks[mask] = values
+
+    log = {'frame': np.array([header[2] for header in headers], dtype=int),
+           'time': parse_log_dates([header[3] for header in headers])}
+    log.update({field: blocks[:, :, i] for i, field in enumerate(fields)})
+    return log
+
+# Numbers of all the point lines in a single parse: the fixed labels are stripped ("Fast Spiral - x: -0.216, y: 0.208, ..." ->
+# " -0.216 0.208 ...") and the rest is read by np.fromstring. Returns a (points, 3) array, or an empty one if the text is irregular:
+def _point_values(text, starts, ends):
+    label = label_regex.search(text, starts[0]) if starts else None
+    if label is None:
+        return np.empty((0, 3))
+
+    body = b''.join(text[start:end] for start, end in zip(starts, ends)).replace(label.group(1) + b' - x:', b'')
+    body = body.translate(None, field_bytes)
+
+    try:
+        values = np.fromstring(body, sep=' ')
+    except ValueError:                                                           # Text left over that is not a number
+        return np.empty((0, 3))
+    return values.reshape(-1, 3) if len(values) % 3 == 0 else np.empty((0, 3))
+
+# Distances alone, read straight from the bytes: the number after every "[AU]: " is gathered for all the points at once, one digit
+# position at a time (integer digits up to the decimal point, then the writers' fixed number of decimals). Returns a (points, 1)
+# array and the points of every frame, or None if the text does not follow that layout (the caller then uses the full parse):
+def _distance_values(text, starts):
+    data = np.frombuffer(text, dtype=np.uint8)
+    marks = starts[0] + np.flatnonzero(data[starts[0]:] == ord(']'))
+    counts = np.diff(np.searchsorted(marks, starts + [len(text)]))
+    if len(marks) == 0:
+        return np.empty((0, 1)), counts
+
+    position = marks + 3                                                         # "... [AU]: 0.820"
+    line_end = text.find(b'\n', position[0])
+    line = text[position[0]:line_end if line_end != -1 else len(text)].rstrip(b'\r')
+    decimals = len(line) - 1 - line.find(b'.')
+    if b'.' not in line or not 0 < decimals <= 9:
+        return None
+
+    # Integer digits: the first one of every number, then one more for the (few) numbers that have not reached the decimal point:
+    last = len(data) - 1
+    digit = data[position] - np.uint8(ord('0'))                                  # Digits are 0..9, anything else wraps above
+    if np.any(digit > 9):
+        return None
+    mantissa = digit.astype(np.int64)
+    position += 1
+
+    pending = np.arange(len(marks))
+    for _ in range(8):
+        digit = data[np.minimum(position[pending], last)] - np.uint8(ord('0'))
+        pending = pending[digit <= 9]
+        if len(pending) == 0:
+            break
+        mantissa[pending] = mantissa[pending] * 10 + digit[digit <= 9]
+        position[pending] += 1
+    if len(pending) or position.max() + decimals > last:
+        return None
+
+    # Decimal point, decimals and line end in a single (points, decimals + 2) gather:
+    tail = data[position[:, np.newaxis] + np.arange(min(decimals + 2, last + 1 - position.max()))]
+    digits = tail[:, 1:decimals + 1] - np.uint8(ord('0'))
+    if np.any(tail[:, 0] != ord('.')) or np.any(digits > 9):
+        return None
+    if tail.shape[1] == decimals + 2 and np.any((tail[:, -1] != ord('\n')) & (tail[:, -1] != ord('\r'))):
+        return None
+
+    mantissa = mantissa * 10 ** decimals + digits.astype(np.int64) @ 10 ** np.arange(decimals - 1, -1, -1)
+    return (mantissa / 10.0 ** decimals)[:, np.newaxis], counts
+
+def parse_spiral_log(path, fields=point_fields):
+    with open(path, 'rb') as file:
+        return parse_spiral_text(file.read(), fields)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# DataFrame in the simulated_distances layout of reading_spiral_data_v3.py:
+#   index Datetime; columns Distance_Row_<r> for the requested rows, then Day, Month, Year, Hour, Minute
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def simulated_distances(log, rows):
+    import pandas as pd
+
+    distance = log['distance']
+    columns = {f"Distance_Row_{r}": (distance[:, r] if r < distance.shape[1] else np.full(len(distance), np.nan)) for r in rows}
+
+    times = pd.DatetimeIndex(log['time'], name='Datetime')
+    df = pd.DataFrame(columns, index=times)
+
+    # Zero-padded fields sliced out of the ISO dates ("2008-01-23T16:39"), much faster than DatetimeIndex.strftime:
+    iso = np.asarray(log['time'], dtype='datetime64[m]').astype('U16').view('U1').reshape(-1, 16)
+    for name, (first, last) in (('Day', (8, 10)), ('Month', (5, 7)), ('Year', (0, 4)), ('Hour', (11, 13)), ('Minute', (14, 16))):
+        df[name] = iso[:, first:last].copy().view(f'U{last - first}').ravel().astype(object)
+    return df
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Byte-offset frame index (<log>.idx): frame number, timestamp and byte offset of every "Frame" header, so a reader can seek
+# straight to a frame or a time window. SIRs writers save it alongside the log; build_frame_index() recreates it for old logs.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+index_dtype = np.dtype([('frame', '<i8'), ('time', '<M8[ms]'), ('offset', '<i8')])
+
+def index_path(path):
+    return f"{path}.idx"
+
+def save_frame_index(path, frames, times, offsets):
+    index = np.zeros(len(frames), dtype=index_dtype)
+    index['frame'], index['time'], index['offset'] = frames, times, offsets
+    with open(index_path(path), 'wb') as file:
+        np.save(file, index)
+    return index
+
+def build_frame_index(path):
+    with open(path, 'rb') as file:
+        text = file.read()
+    matches = list(frame_regex.finditer(text))
+    return save_frame_index(path, [int(match.group(1)) for match in matches], parse_log_dates([match.group(2) for match in matches]),
+                            [match.start() for match in matches])
+
+# Saved index if it is up to date with the log, otherwise a fresh one:
+def load_frame_index(path):
+    if os.path.exists(index_path(path)) and os.path.getmtime(index_path(path)) >= os.path.getmtime(path):
+        with open(index_path(path), 'rb') as file:
+            return np.load(file)
+    return build_frame_index(path)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Read only some frames: a list of frame numbers, or a time window [start, stop) (datetime64 or ISO strings):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def read_frames(path, frames=None, start=None, stop=None):
+    index = load_frame_index(path)
+
+    if frames is not None:
+        selected = np.flatnonzero(np.isin(index['frame'], frames))
+    else:
+        first = 0 if start is None else np.searchsorted(index['time'], np.datetime64(start, 'ms'), side='left')
+        last = len(index) if stop is None else np.searchsorted(index['time'], np.datetime64(stop, 'ms'), side='left')
+        selected = np.arange(first, last)
+
+    if len(selected) == 0:
+        return parse_spiral_text(b'')
+
+    # One contiguous read from the first to the last selected frame, then keep only the selected ones:
+    first, last = selected[0], selected[-1]
+    with open(path, 'rb') as file:
+        file.seek(index['offset'][first])
+        if last + 1 < len(index):
+            text = file.read(index['offset'][last + 1] - index['offset'][first])
+        else:
+            text = file.read()
+
+    log = parse_spiral_text(text)
+    keep = selected - first
+    return {key: values[keep] for key, values in log.items()}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Tail-follow a log that is still being written: every poll() reads only the bytes appended since the last one and parses the
+# complete frames among them (a frame is complete once its closing blank line is there; a partial frame waits for the next poll).
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class LogFollower:
+
+    def __init__(self, path, rows):
+        self.path = path
+        self.rows = rows
+        self.reset()
+
+    def reset(self):
+        self.position = 0
+        self.pending = b''
+        self.log = None
+        self.df = None
+
+    # Parse the newly appended complete frames; returns their simulated_distances rows (None when there is nothing new):
+    def poll(self):
+        size = os.path.getsize(self.path)
+        if size < self.position:                                                 # The log was overwritten by a new run
+            self.reset()
+        if size == self.position:
+            return None
+
+        with open(self.path, 'rb') as file:
+            file.seek(self.position)
+            data = self.pending + file.read(size - self.position)
+        self.position = size
+
+        end = max(data.rfind(b'\n\n'), data.rfind(b'\r\n\r\n'))
+        if end < 0:
+            self.pending = data
+            return None
+        complete, self.pending = data[:end], data[end:]
+
+        new = parse_spiral_text(complete, ('distance',))
+        if len(new['frame']) == 0:
+            return None
+
+        if self.log is None:
+            self.log = new
+        else:
+            self.log = {key: np.concatenate((self.log[key], new[key])) for key in new}
+
+        import pandas as pd
+
+        new_df = simulated_distances(new, self.rows)
+        self.df = new_df if self.df is None else pd.concat([self.df, new_df])
+        return new_df
+
+    # Poll every interval seconds, appending the new rows to output (same layout as reading_spiral_data_v3.py) and passing them to
+    # callback; stops after idle_polls polls in a row without new frames (None = follow forever):
+    def follow(self, interval=1.0, output=None, callback=None, idle_polls=None):
+        idle = 0
+        while idle_polls is None or idle < idle_polls:
+            new_df = self.poll()
+            if new_df is None:
+                idle += 1
+                time.sleep(interval)
+                continue
+
+            idle = 0
+            if output is not None:
+                first = self.df is new_df
+                new_df.to_csv(output, header=first, index=None, sep='\t', mode='w' if first else 'a', float_format='%.3f')
+            if callback is not None:
+                callback(new_df)
+
+        return self.df
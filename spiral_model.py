@@ -0,0 +1,191 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Importable SIR spiral model (numpy only): the parameter block of SIRs_v1.py as an object, with no prompts, plots or files.
+#
+#   from spiral_model import SpiralModel
+#   model = SpiralModel(v_sw_slow=294, angle2Earth=-46, obstime='2008-01-23T16:39')
+#   x_rot, y_rot, distances = model.frames['fast']
+#
+#   model = SpiralModel(streams={'slow': 294, 'ch1': (520, -30), 'ch2': (610, 75)})       # name: speed or (speed, angle2Earth)
+#
+# The streams are kept as a structure of arrays (one speed and one source longitude per stream), and the geometry and frames of
+# all of them are computed in single broadcasts; the per-stream dicts (phi, t0, frames, distances) are views of those arrays.
+#
+# phi, the t0 positions and the frames are computed on first use and kept on the model. The invariant geometry (which only depends
+# on the parameters) is also memoized across models, so a pipeline that builds thousands of models with repeated parameters does
+# not recompute it. Plotting (spiral_plot) and output (spiral_io) stay in their own modules.
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+from functools import cached_property, lru_cache
+
+import numpy as np
+
+from spiral_engine import (FrameKernel, SpiralIndex, earth_xy, iter_frame_chunks, rotate_frames, spiral_phi, spiral_t0, theta_at,
+                           time_offset)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+default_params = {'v_sw_slow': 294,
+                  'v_sw_fast': 694,
+                  'r_min': 0.3,
+                  'r_max': 2.5,
+                  'n_points': 50,
+                  'angle2Earth': -46}
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Memoized geometry, shared by every model. The arrays are read-only so a caller cannot corrupt the cache:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def _read_only(*arrays):
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+# (r0, phi, x_t0_new, y_t0_new) of one stream, or of stacked streams when v_sw and angle2Earth are tuples (phi and the t0 positions
+# then have shape (streams, points)):
+@lru_cache(maxsize=1024)
+def spiral_geometry(v_sw, r_min, r_max, n_points, angle2Earth):
+    v_sw = np.asarray(v_sw, dtype=float)[..., np.newaxis]
+    angle2Earth = np.asarray(angle2Earth, dtype=float)[..., np.newaxis]
+    r0, phi = spiral_phi(v_sw, r_min, r_max, n_points)
+    return _read_only(r0, phi, *spiral_t0(v_sw, r_min, r_max, n_points, angle2Earth))
+
+# (hours, theta_values) of the output frames:
+@lru_cache(maxsize=64)
+def frame_angles(n_frames, cadence, time_offset=time_offset):
+    hours = np.arange(n_frames) * cadence
+    return _read_only(hours, theta_at(hours, time_offset))
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# The model. cadence is the number of hours between output frames (time_offset by default, i.e. one frame per degree).
+# streams maps a name to a speed, or to (speed, angle2Earth); by default there are a slow and a fast stream at angle2Earth:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+class SpiralModel:
+
+    def __init__(self, v_sw_slow=294, v_sw_fast=694, r_min=0.3, r_max=2.5, n_points=50, angle2Earth=-46, n_frames=360,
+                 cadence=None, time_offset=time_offset, obstime=None, observer=earth_xy, streams=None):
+        if streams is None:
+            streams = {'slow': v_sw_slow, 'fast': v_sw_fast}
+        if not streams:
+            raise ValueError('The model needs at least one stream')
+        streams = {name: tuple(value) if np.ndim(value) else (value, angle2Earth) for name, value in streams.items()}
+
+        # Structure of arrays, one entry per stream:
+        self.names = tuple(streams)
+        self.v_sw = np.array([float(v_sw) for v_sw, longitude in streams.values()])
+        self.longitudes = np.array([float(longitude) for v_sw, longitude in streams.values()])
+
+        self.r_min = float(r_min)
+        self.r_max = float(r_max)
+        self.n_points = int(n_points)
+        self.angle2Earth = float(angle2Earth)
+        self.n_frames = int(n_frames)
+        self.time_offset = float(time_offset)
+        self.cadence = float(cadence or time_offset)
+        self.obstime = None if obstime is None else np.datetime64(obstime, 'ms')
+        self.observer = tuple(observer)
+
+    # From a dict with the sirs_cli option names (other keys are ignored); keyword arguments override the dict:
+    @classmethod
+    def from_config(cls, config, **overrides):
+        params = {key: config[key] for key in ('v_sw_slow', 'v_sw_fast', 'r_min', 'r_max', 'n_points', 'angle2Earth', 'time_offset',
+                                               'cadence', 'streams') if config.get(key) is not None}
+        if config.get('frames') is not None:
+            params['n_frames'] = config['frames']
+        params.update(overrides)
+        return cls(**params)
+
+    def __repr__(self):
+        return f"SpiralModel({', '.join(f'{key}={value!r}' for key, value in self.params.items())})"
+
+    # Parameters saved with a run (the header of a .sirs file): v_sw_<stream> for every stream, and a single angle2Earth unless the
+    # streams start at different longitudes (then angle2Earth_<stream>):
+    @property
+    def params(self):
+        params = {f'v_sw_{name}': float(v_sw) for name, v_sw in zip(self.names, self.v_sw)}
+        params.update({'r_min': self.r_min, 'r_max': self.r_max, 'n_points': self.n_points})
+        if np.all(self.longitudes == self.longitudes[0]):
+            params['angle2Earth'] = float(self.longitudes[0])
+        else:
+            params.update({f'angle2Earth_{name}': float(longitude) for name, longitude in zip(self.names, self.longitudes)})
+        params.update({'time_offset': self.time_offset, 'cadence': self.cadence})
+        return params
+
+    # Solar wind speed [km/s] of each stream:
+    @property
+    def speeds(self):
+        return dict(zip(self.names, self.v_sw.tolist()))
+
+    # (r0, phi, x_t0_new, y_t0_new) of one stream:
+    def geometry(self, name):
+        r0, phi, x_t0_new, y_t0_new = self.stacked_geometry
+        i = self.names.index(name)
+        return r0, phi[i], x_t0_new[i], y_t0_new[i]
+
+    # ----------------------------------------------------------------------------------------------------------------------------------
+    # Lazily computed geometry, for all the streams at once (shape (streams, ...)):
+    # ----------------------------------------------------------------------------------------------------------------------------------
+
+    @cached_property
+    def stacked_geometry(self):
+        return spiral_geometry(tuple(self.v_sw.tolist()), self.r_min, self.r_max, self.n_points, tuple(self.longitudes.tolist()))
+
+    @cached_property
+    def r0(self):
+        return self.stacked_geometry[0]
+
+    @cached_property
+    def phi(self):
+        return dict(zip(self.names, self.stacked_geometry[1]))
+
+    # (x_t0_new, y_t0_new) of each stream:
+    @cached_property
+    def t0(self):
+        return {name: (x_t0_new, y_t0_new) for name, x_t0_new, y_t0_new in zip(self.names, *self.stacked_geometry[2:])}
+
+    @cached_property
+    def hours(self):
+        return frame_angles(self.n_frames, self.cadence, self.time_offset)[0]
+
+    @cached_property
+    def theta_values(self):
+        return frame_angles(self.n_frames, self.cadence, self.time_offset)[1]
+
+    @cached_property
+    def times(self):
+        if self.obstime is None:
+            raise ValueError('The model has no obstime')
+        return self.obstime + np.round(self.hours * 3.6e6).astype('timedelta64[ms]')
+
+    # (x_rot, y_rot, distances) of all the streams, shape (streams, frames, points):
+    @cached_property
+    def stacked_frames(self):
+        return rotate_frames(*self.stacked_geometry[2:], self.theta_values, self.observer)
+
+    # The same per stream, shape (frames, points):
+    @cached_property
+    def frames(self):
+        return {name: tuple(frames) for name, *frames in zip(self.names, *self.stacked_frames)}
+
+    @cached_property
+    def distances(self):
+        return dict(zip(self.names, self.stacked_frames[2]))
+
+    # ----------------------------------------------------------------------------------------------------------------------------------
+    # Other views of the same geometry:
+    # ----------------------------------------------------------------------------------------------------------------------------------
+
+    # Frames in chunks of chunk_frames (spiral_engine.iter_frame_chunks) for runs too long to keep in memory:
+    def chunks(self, chunk_frames=4096):
+        return iter_frame_chunks(self.t0, self.n_frames, self.cadence, chunk_frames, self.time_offset, self.observer)
+
+    # In-place frame kernels for the live animation (one kernel computes every stream of a frame):
+    def kernels(self):
+        kernel = FrameKernel(*self.stacked_geometry[2:], self.theta_values, self.observer)
+        return {name: kernel.stream(i) for i, name in enumerate(self.names)}
+
+    @cached_property
+    def index(self):
+        return {name: SpiralIndex(x_t0_new, y_t0_new) for name, (x_t0_new, y_t0_new) in self.t0.items()}
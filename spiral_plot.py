@@ -0,0 +1,194 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Plotting layer: HEE axes with the background bodies and the spiral animation (needs matplotlib only).
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import numpy as np
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+
+from matplotlib.ticker import MultipleLocator
+from matplotlib.animation import FuncAnimation
+
+from spiral_engine import FrameKernel, StreamKernel
+from spiral_io import format_log_date
+from profiling import stage
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+spacecraft_colors = {'A': 'red', 'B': 'blue'}
+
+# (line color, scatter color) of each stream:
+stream_colors = {'slow': ('deepskyblue', 'skyblue'),
+                 'fast': ('deepskyblue', 'deepskyblue')}
+
+lod_pixels = 3.0                                                                 # On-screen spacing of the drawn points
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# HEE axes (Y HEE horizontal, X HEE vertical pointing down to Earth), with the bodies of hee_coords.hee_background():
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def setup_figure(background=None):
+    mpl.rcParams.update({'figure.facecolor': 'white',
+                         'axes.edgecolor': 'black',
+                         'axes.facecolor': 'white',
+                         'axes.labelcolor': 'black',
+                         'axes.titlecolor': 'black',
+                         'lines.linewidth': 2,
+                         'xtick.color': 'black',
+                         'xtick.direction': 'in',
+                         'xtick.top': True,
+                         'ytick.color': 'black',
+                         'ytick.direction': 'in',
+                         'ytick.right': True})
+
+    fig = plt.figure()
+    ax = fig.add_subplot()
+
+    ax.set_xlim(-2.15, 2.15)
+    ax.set_xlabel('Y (HEE)')
+    ax.xaxis.set_major_locator(MultipleLocator(1))
+    ax.xaxis.set_minor_locator(MultipleLocator(0.1))
+
+    ax.set_ylim(1.8, -1.8)
+    ax.set_ylabel('X (HEE)')
+    ax.yaxis.set_major_locator(MultipleLocator(1))
+    ax.yaxis.set_minor_locator(MultipleLocator(0.1))
+
+    ax.set_aspect('equal')
+
+    ax.plot([0, 0], [0, 2], linestyle='dotted', color='gray')
+
+    if background is not None:
+        for planet, orbit in background['orbits'].items():
+            ax.plot(*orbit, linestyle='dashed', color='gray')
+
+        for planet, (x, y) in background['planets'].items():
+            if planet == 'Earth':
+                color, markersize, offset = 'lime', 10, 0.1
+            else:
+                color, markersize, offset = 'gray', None, 0.05
+
+            ax.plot(x, y, 'o', markersize=markersize, color=color)
+            ax.text(x + offset, y + offset, planet, color=color)
+
+        for label, (x, y) in background['spacecraft'].items():
+            color = spacecraft_colors.get(label, 'gray')
+            ax.plot(x, y, 'o', color=color)
+            ax.text(x + 0.1, y, label, color=color, fontsize=10)
+            ax.plot([0, x], [0, y], linestyle='dotted', color=color)
+
+    ax.plot(0, 0, 'o', markersize=15, color='orange')
+    ax.text(0.12, 0, 'Sun', color='orange')
+
+    return fig, ax
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Line and scatter artists of every stream, plus the timestamp text:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def spiral_artists(ax, names):
+    artists = {}
+    for name in names:
+        line_color, scatter_color = stream_colors.get(name, ('deepskyblue', 'deepskyblue'))
+        spiral_line, = ax.plot([], [], color=line_color)
+        scatter_points = ax.scatter([], [], s=7, zorder=1, color=scatter_color, marker=".")
+        artists[name] = (spiral_line, scatter_points)
+
+    # Create a text element for the timestamp:
+    time_text = ax.text(0.5, -2.0, '', color='black', fontsize=12, bbox=dict(facecolor='white', alpha=0.8))
+
+    return artists, time_text
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Level of detail: only the points inside the view (plus one neighbour on each side, so the line still leaves the axes) are kept, and
+# every visible stretch is resampled along the spiral every lod_pixels of on-screen arc length. The drawing cost then follows the
+# visible arc (axes size, not zoom level or n_points), while the engine keeps the full resolution. Stretches already sparser than
+# that are drawn untouched; separate stretches are split by a NaN row, so no line is drawn between them:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+# Indices of one stretch (display coordinates) resampled every pixels of arc length:
+def lod_indices(display, pixels=lod_pixels):
+    steps = np.diff(display, axis=0)
+    arc = np.concatenate(([0.0], np.cumsum(np.sqrt(steps[:, 0] ** 2 + steps[:, 1] ** 2))))
+
+    if not np.isfinite(arc[-1]) or arc[-1] >= pixels * (len(arc) - 1):
+        return np.arange(len(arc))
+
+    # First point past every multiple of pixels, plus the end of the stretch:
+    index = np.searchsorted(arc, np.arange(0, arc[-1], pixels))
+    return np.unique(np.append(index, len(arc) - 1))
+
+def lod_offsets(ax, offsets, pixels=lod_pixels):
+    (x_min, y_min), (x_max, y_max) = np.sort(ax.viewLim.get_points(), axis=0)
+    inside = (offsets[:, 0] >= x_min) & (offsets[:, 0] <= x_max) & (offsets[:, 1] >= y_min) & (offsets[:, 1] <= y_max)
+    keep = inside.copy()
+    keep[1:] |= inside[:-1]
+    keep[:-1] |= inside[1:]
+
+    index = np.flatnonzero(keep)
+    if len(index) == 0:
+        return offsets[:0]
+    display = ax.transData.transform(offsets[index])
+
+    pieces = []
+    for stretch in np.split(np.arange(len(index)), np.flatnonzero(np.diff(index) > 1) + 1):
+        if pieces:
+            pieces.append(np.full((1, 2), np.nan))
+        pieces.append(offsets[index[stretch[lod_indices(display[stretch], pixels)]]])
+    return np.concatenate(pieces)
+
+# Move the artists to one frame. streams maps a stream name to its (x_rot, y_rot) blocks of shape (frames, points), or to a
+# spiral_engine.FrameKernel (or StreamKernel) that computes the frame in its own buffers (the artists copy what they are given).
+# lod_pixels=None draws every point:
+def draw_frame(artists, time_text, times, streams, frame, lod_pixels=lod_pixels):
+    updated = []
+    for name, source in streams.items():
+        spiral_line, scatter_points = artists[name]
+        if isinstance(source, (FrameKernel, StreamKernel)):
+            offsets = source.compute(frame)
+        else:
+            x_rot_all, y_rot_all = source
+            offsets = np.column_stack((y_rot_all[frame], x_rot_all[frame]))
+
+        if lod_pixels:
+            offsets = lod_offsets(spiral_line.axes, offsets, lod_pixels)
+
+        scatter_points.set_offsets(offsets)
+        spiral_line.set_data(offsets[:, 0], offsets[:, 1])
+        updated += [spiral_line, scatter_points]
+
+    time_text.set_text(format_log_date(times[frame]))
+
+    return (*updated, time_text)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Occupancy heatmap (spiral_heatmap.OccupancyGrid) under the bodies, on a log color scale:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def draw_occupancy(ax, grid, cmap='viridis'):
+    xlim, ylim = ax.get_xlim(), ax.get_ylim()
+    y_min, y_max, x_min, x_max = grid.extent
+
+    counts = np.ma.masked_equal(grid.counts, 0)
+    image = ax.imshow(counts, origin='lower', extent=(y_min, y_max, x_min, x_max), cmap=cmap, norm=mpl.colors.LogNorm(),
+                      interpolation='nearest', zorder=0)
+    ax.figure.colorbar(image, ax=ax, label='Samples per cell')
+
+    ax.set_xlim(xlim)
+    ax.set_ylim(ylim)
+    return image
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Animate precomputed frames, or frame kernels computed on the fly:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def animate(fig, ax, times, streams, interval=100, lod_pixels=lod_pixels):
+    artists, time_text = spiral_artists(ax, streams)
+
+    def update(frame):
+        with stage('render'):
+            return draw_frame(artists, time_text, times, streams, frame, lod_pixels)
+
+    return FuncAnimation(fig, update, frames=len(times), interval=interval, blit=True)
@@ -0,0 +1,77 @@
+# Author: E. Tirado-Bueno (etirado@inaoe.mx)
+# Last Update: 17 / 10 / 2026
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Headless movie export: renders the frames of a .sirs run on the Agg backend, splitting the frame range across worker processes,
+# and stitches the numbered PNG sequence into a video with ffmpeg (when it is installed).
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+import multiprocessing
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from profiling import stage
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+frame_pattern = 'frame_%05d.png'
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Worker: render a block of frames (output numbers first_image, first_image + 1, ...):
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def render_block(run_path, out_dir, frames, first_image, background=None, dpi=100):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    from spiral_io import open_spiral_binary
+    from spiral_plot import draw_frame, setup_figure, spiral_artists
+
+    run = open_spiral_binary(run_path)
+    streams = {name: (arrays['x'], arrays['y']) for name, arrays in run.streams.items()}
+
+    fig, ax = setup_figure(background)
+    artists, time_text = spiral_artists(ax, streams)
+
+    for image, frame in enumerate(frames, start=first_image):
+        draw_frame(artists, time_text, run.times, streams, frame)
+        fig.savefig(os.path.join(out_dir, frame_pattern % image), dpi=dpi)
+
+    plt.close(fig)
+    return len(frames)
+
+# --------------------------------------------------------------------------------------------------------------------------------------
+# Render every frame_step-th frame with one contiguous block per worker, then stitch the video:
+# --------------------------------------------------------------------------------------------------------------------------------------
+
+def export_movie(run_path, out_dir, background=None, video=None, fps=10, processes=None, frame_step=1, dpi=100):
+    from spiral_io import open_spiral_binary
+
+    os.makedirs(out_dir, exist_ok=True)
+    frames = np.arange(0, open_spiral_binary(run_path).n_frames, frame_step)
+
+    processes = min(processes or os.cpu_count(), len(frames))
+    blocks = np.array_split(frames, processes)
+    starts = np.cumsum([0] + [len(block) for block in blocks[:-1]])
+
+    # Spawned workers start without any pyplot state from this process:
+    with stage('render'), ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        jobs = [pool.submit(render_block, run_path, out_dir, block.tolist(), int(start), background, dpi)
+                for block, start in zip(blocks, starts)]
+        rendered = sum(job.result() for job in jobs)
+
+    if video:
+        if shutil.which('ffmpeg') is None:
+            print(f"ffmpeg not found: {rendered} frames left as an image sequence in {out_dir}")
+            return None
+        with stage('video'):
+            subprocess.check_call(['ffmpeg', '-y', '-loglevel', 'error', '-framerate', str(fps),
+                                   '-i', os.path.join(out_dir, frame_pattern), '-pix_fmt', 'yuv420p',
+                                   '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', video])
+        return video
+
+    return out_dir